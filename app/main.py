@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routers import log_router, dashboard_router
-from app.models.database import engine, Base
+from app.routers import log_router, dashboard_router, scheduler_router, metrics_router, admin_router
+from app.models.database import engine, async_engine, Base
+from app.models.migrations import run_migrations
+from app.services.scheduler import scheduler, INGEST_SCHEDULER_ENABLED
+from app.services.watcher import watcher, INGEST_WATCHER_ENABLED
+from app.services.request_timing import RequestTimingMiddleware, TimedRoute, install_db_timing
 
 Base.metadata.create_all(bind=engine)
-app = FastAPI()
+run_migrations(engine)
+install_db_timing(engine, async_engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if INGEST_SCHEDULER_ENABLED:
+        await scheduler.start()
+        if INGEST_WATCHER_ENABLED:
+            await watcher.start()
+    yield
+    await watcher.stop()
+    await scheduler.stop()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TimedRoute
 
 origins = [
     "http://localhost:3001",
@@ -25,8 +48,12 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
+app.add_middleware(RequestTimingMiddleware)
 app.include_router(log_router.router)
 app.include_router(dashboard_router.router)
+app.include_router(scheduler_router.router)
+app.include_router(metrics_router.router)
+app.include_router(admin_router.router)
 
 
 @app.get("/")
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, BigInteger, Boolean
 from app.models.database import Base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, expression
 
 
 class lastfileEntry(Base):
@@ -12,4 +12,9 @@ class lastfileEntry(Base):
     file_name =Column(String)
     file_path=Column(String)
     date_processed= Column(DateTime, default=func.now())
+    # Watermark inside file_name: everything before byte_offset is committed.
+    byte_offset = Column(BigInteger, nullable=False, default=0, server_default="0")
+    record_count = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Boolean, nullable=False, default=True, server_default=expression.true())
+
 
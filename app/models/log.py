@@ -1,17 +1,45 @@
-
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import (BigInteger, Column, String, Integer, SmallInteger, DateTime, Index, LargeBinary, Sequence, case,
+                        func)
+from sqlalchemy.orm import column_property
 from app.models.database import Base
-class LogEntry(Base):
+from app.models.message_type import MessageType
+from app.models.sap_instance import SapInstance
+
+LOG_ENTRY_ID_SEQUENCE = Sequence("log_entries_id_seq")
+MESSAGE_PLACEHOLDERS = ("&A", "&B", "&C", "&D", "&E", "&F", "&G", "&H", "&I", "&J")
+# Stored columns /logs/search matches by substring; one trigram GIN index
+# covers them where pg_trgm is installed (see create_search_index()).
+SEARCH_COLUMNS = ("first_variable_value", "second_variable_value", "third_variable_value", "other_variable_values",
+                  "long_terminal_name", "program")
+
+
+class StoredLogEntry(Base):
     __tablename__ = "log_entries"
+    __table_args__ = (
+        Index("ix_log_entries_event_timestamp", "event_timestamp"),
+        Index("ix_log_entries_instance_id_event_timestamp", "instance_id", "event_timestamp"),
+        Index("ix_log_entries_user_event_timestamp", "user", "event_timestamp"),
+        Index("ix_log_entries_transaction_code_event_timestamp", "transaction_code", "event_timestamp"),
+        Index("ix_log_entries_program_event_timestamp", "program", "event_timestamp"),
+        Index("ix_log_entries_message_type_id_event_timestamp", "message_type_id", "event_timestamp"),
+        # Natural key for idempotent ingestion: where the record was read from.
+        # A unique index on a partitioned table has to include the partition key.
+        Index("uq_log_entries_source", "instance_id", "source_file", "source_offset", "event_timestamp", unique=True),
+        {"postgresql_partition_by": "RANGE (event_timestamp)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    sap_system_id = Column(String, index=True)
-    app_server_instance = Column(String)
-    message_identifier = Column(String)
-    syslog_msg_group = Column(String,nullable=True)
-    sub_name = Column(String,nullable=True)
+    # A primary key on a partitioned table must include event_timestamp, which
+    # is nullable, so id is unique by its sequence and is the ORM identity only.
+    id = Column(Integer, LOG_ENTRY_ID_SEQUENCE, server_default=LOG_ENTRY_ID_SEQUENCE.next_value(), nullable=False,
+                index=True)
+    __mapper_args__ = {"primary_key": [id]}
+    # Keys into sap_instances and message_types. System, instance and message
+    # attributes are stored once there and read through LogEntry.
+    instance_id = Column(SmallInteger, nullable=False)
+    message_type_id = Column(SmallInteger, nullable=False)
     date = Column(String)
     time = Column(String)
+    event_timestamp = Column(DateTime, nullable=True)
     operating_system_number = Column(String,nullable=True)
     work_process_number = Column(String,nullable=True)
     sap_process = Column(String,nullable=True)
@@ -26,10 +54,58 @@ class LogEntry(Base):
     first_variable_value = Column(String,nullable=True)
     second_variable_value = Column(String,nullable=True)
     third_variable_value = Column(String,nullable=True)
-    audit_log_msg_text = Column(String,nullable=True)
-    audit_class = Column(String,nullable=True)
-    message_severity = Column(String,nullable=True)
-    criticality =Column(String,nullable=True)
     other_variable_values = Column(String,nullable=True)
-    
-    
+    # Number of event data variables, so the message text can be rendered
+    # exactly as the parser used to: placeholders past it stay in the text.
+    variable_count = Column(SmallInteger, nullable=False, server_default="0")
+    # SHA-256 digest as 32 raw bytes; LogEntry reads it back as hex.
+    record_hash = Column(LargeBinary, nullable=True)
+    # The .AUD file name and the byte offset of the record in it. SAP writes
+    # identical events in the same second as separate records with the same
+    # hash, so only their position tells them apart.
+    source_file = Column(String, nullable=True)
+    source_offset = Column(BigInteger, nullable=True)
+    # Only set on rows converted from the denormalized layout whose stored
+    # message text the template does not reproduce; read in its place.
+    message_text_override = Column(String, nullable=True)
+
+
+_stored = StoredLogEntry.__table__
+_instances = SapInstance.__table__
+_message_types = MessageType.__table__
+
+
+def render_message_text(template, entries=_stored):
+    # Nested replace() over the template: the n-th placeholder becomes the
+    # n-th variable when the record has one, otherwise it is left as is.
+    variables = [entries.c.first_variable_value, entries.c.second_variable_value, entries.c.third_variable_value]
+    variables += [func.split_part(entries.c.other_variable_values, "&", position)
+                  for position in range(1, len(MESSAGE_PLACEHOLDERS) - 2)]
+    text = template
+    for position, (placeholder, value) in enumerate(zip(MESSAGE_PLACEHOLDERS, variables)):
+        text = func.replace(text, placeholder, case(
+            (entries.c.variable_count > position, func.coalesce(value, "")), else_=placeholder
+        ))
+    return text
+
+
+class LogEntry(Base):
+    # Read-only view with the attributes log_entries had before it was
+    # normalized: the stored row joined with its dimension rows, and
+    # audit_log_msg_text rendered from the template and the variables.
+    __table__ = _stored.join(_instances, _stored.c.instance_id == _instances.c.id).join(
+        _message_types, _stored.c.message_type_id == _message_types.c.id
+    )
+    __mapper_args__ = {
+        "primary_key": [_stored.c.id],
+        "exclude_properties": [
+            _instances.c.id, _message_types.c.id, _stored.c.instance_id, _stored.c.message_type_id,
+            _stored.c.variable_count, _stored.c.record_hash, _stored.c.message_text_override,
+            _stored.c.source_file, _stored.c.source_offset, _message_types.c.message_text,
+        ],
+    }
+
+    id = _stored.c.id
+    audit_log_msg_text = column_property(func.coalesce(_stored.c.message_text_override,
+                                                       render_message_text(_message_types.c.message_text)))
+    record_hash = column_property(func.upper(func.encode(_stored.c.record_hash, "hex")))
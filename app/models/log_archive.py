@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Integer, DateTime, BigInteger
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+
+class LogArchive(Base):
+    __tablename__ = "log_archive"
+
+    # One Parquet file per archived log_entries partition, holding the rows
+    # with event_timestamp in [range_start, range_end).
+    id = Column(Integer, primary_key=True, index=True)
+    partition_name = Column(String, nullable=False)
+    range_start = Column(DateTime, nullable=False, index=True)
+    range_end = Column(DateTime, nullable=False)
+    path = Column(String, nullable=False)
+    row_count = Column(BigInteger, nullable=False)
+    archived_at = Column(DateTime, default=func.now())
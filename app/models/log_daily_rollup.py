@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Date, BigInteger
+from app.models.database import Base
+
+
+class LogDailyRollup(Base):
+    __tablename__ = "log_daily_rollup"
+
+    # Event counts per day and dimension combination. Dimensions are part of
+    # the key, so missing values are stored as '' rather than NULL.
+    event_date = Column(Date, primary_key=True)
+    sap_system_id = Column(String, primary_key=True, server_default="")
+    transaction_code = Column(String, primary_key=True, server_default="")
+    criticality = Column(String, primary_key=True, server_default="")
+    audit_class = Column(String, primary_key=True, server_default="")
+    log_count = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, SmallInteger, String
+from app.models.database import Base
+
+
+class MessageType(Base):
+    __tablename__ = "message_types"
+
+    # One row per SM20 message ID, kept in sync with the message catalog. Log
+    # entries only store the id; their text is rendered from message_text.
+    id = Column(SmallInteger, primary_key=True)
+    message_identifier = Column(String, nullable=False, unique=True)
+    syslog_msg_group = Column(String, nullable=False)
+    sub_name = Column(String, nullable=False)
+    message_text = Column(String, nullable=True)
+    audit_class = Column(String, nullable=True)
+    message_severity = Column(String, nullable=True)
+    criticality = Column(String, nullable=True)
@@ -0,0 +1,87 @@
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.models.database import engine
+from app.models.log import SEARCH_COLUMNS, StoredLogEntry
+from app.services.dimension_service import needs_normalization, sync_message_types
+from app.services.partition_service import create_upcoming_partitions, partition_log_entries
+from app.services.rollup_service import seed_daily_rollup
+
+# create_all() only creates missing tables, so columns added to existing
+# tables are applied here. Every statement must be safe to run repeatedly.
+MIGRATIONS = [
+    "ALTER TABLE last_file_processed ADD COLUMN IF NOT EXISTS byte_offset BIGINT NOT NULL DEFAULT 0",
+    "ALTER TABLE last_file_processed ADD COLUMN IF NOT EXISTS record_count INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE last_file_processed ADD COLUMN IF NOT EXISTS completed BOOLEAN NOT NULL DEFAULT true",
+    "ALTER TABLE log_entries ADD COLUMN IF NOT EXISTS event_timestamp TIMESTAMP",
+    "ALTER TABLE log_entries ADD COLUMN IF NOT EXISTS record_hash VARCHAR",
+    "ALTER TABLE log_entries ADD COLUMN IF NOT EXISTS message_text_override VARCHAR",
+    "ALTER TABLE log_entries ADD COLUMN IF NOT EXISTS source_file VARCHAR",
+    "ALTER TABLE log_entries ADD COLUMN IF NOT EXISTS source_offset BIGINT",
+    # Replaced by uq_log_entries_source: identical events share a hash.
+    "DROP INDEX IF EXISTS uq_log_entries_record_hash_event_timestamp",
+]
+
+BACKFILL_BATCH_SIZE = 50000
+
+# Rows written before event_timestamp existed only carry the display strings
+# ("2024-11-07", "06:05:19 AM"); the index on event_timestamp finds them.
+EVENT_TIMESTAMP_BACKFILL = text("""
+    UPDATE log_entries
+    SET event_timestamp = to_timestamp(date || ' ' || time, 'YYYY-MM-DD HH12:MI:SS AM')::timestamp
+    WHERE id IN (
+        SELECT id FROM log_entries
+        WHERE event_timestamp IS NULL AND date IS NOT NULL AND time IS NOT NULL
+        LIMIT :batch_size
+    )
+""")
+
+# Created on the partitioned parent, so every partition gets its own copy.
+# One multicolumn index keeps the write cost down compared to one per column.
+SEARCH_INDEX = text("CREATE INDEX IF NOT EXISTS ix_log_entries_search_trgm ON log_entries USING gin ({})".format(
+    ", ".join(f"{column} gin_trgm_ops" for column in SEARCH_COLUMNS + ("message_text_override",))
+))
+
+
+def backfill_event_timestamps(bind=engine, batch_size=BACKFILL_BATCH_SIZE):
+    updated = 0
+    while True:
+        with bind.begin() as connection:
+            rowcount = connection.execute(EVENT_TIMESTAMP_BACKFILL, {"batch_size": batch_size}).rowcount
+        updated += rowcount
+        if rowcount < batch_size:
+            return updated
+
+
+def create_search_index(bind=engine):
+    # pg_trgm comes with PostgreSQL's contrib package and creating it needs
+    # the right privileges. Without it /logs/search still works, by scanning.
+    try:
+        with bind.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(SEARCH_INDEX)
+        return True
+    except DBAPIError as e:
+        print(f"Search index not created, /logs/search will scan log_entries: {e.orig}")
+        return False
+
+
+def run_migrations(bind=engine):
+    with bind.begin() as connection:
+        for statement in MIGRATIONS:
+            connection.execute(text(statement))
+    backfill_event_timestamps(bind)
+    sync_message_types(bind)
+    # Converting the layout from before the dimension tables rewrites the
+    # whole table, so it is never done at startup.
+    with bind.connect() as connection:
+        if needs_normalization(connection):
+            raise RuntimeError("log_entries predates the dimension tables; stop the API and run "
+                               "python -m app.services.dimension_service normalize")
+    with bind.begin() as connection:
+        for index in StoredLogEntry.__table__.indexes:
+            index.create(connection, checkfirst=True)
+    partition_log_entries(bind)
+    create_upcoming_partitions(bind)
+    create_search_index(bind)
+    seed_daily_rollup(bind)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, SmallInteger, String, UniqueConstraint
+from app.models.database import Base
+
+
+class SapInstance(Base):
+    __tablename__ = "sap_instances"
+    __table_args__ = (UniqueConstraint("sap_system_id", "app_server_instance"),)
+
+    # Missing values are stored as '' so the pair stays unique.
+    id = Column(SmallInteger, primary_key=True)
+    sap_system_id = Column(String, nullable=False, server_default="")
+    app_server_instance = Column(String, nullable=False, server_default="")
@@ -0,0 +1,41 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.routing import APIRoute
+
+from app.schemas.admin_schema import ProfilingConfig
+from app.services.request_timing import TimedRoute, profiling
+
+# Admin endpoints are disabled unless a token is configured.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(route_class=TimedRoute, dependencies=[Depends(require_admin)])
+
+
+@router.get("/admin/profiling")
+async def get_profiling():
+    return profiling.status()
+
+
+@router.put("/admin/profiling")
+async def set_profiling(config: ProfilingConfig, request: Request):
+    routes = {route.path for route in request.app.routes if isinstance(route, APIRoute)}
+    if config.route not in routes:
+        raise HTTPException(status_code=400, detail=f"Unknown route: {config.route}")
+    profiling.configure(config.route, config.sample_rate, config.max_profiles)
+    return profiling.status()
+
+
+@router.delete("/admin/profiling")
+async def disable_profiling():
+    profiling.disable()
+    return profiling.status()
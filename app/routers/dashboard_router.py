@@ -1,43 +1,34 @@
 from typing import List, cast
 from fastapi import APIRouter, Depends, HTTPException, Form,Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime,date
 
-from app.models.database import get_db
-from app.models.log import LogEntry
+from app.models.database import get_async_db
+from app.models.log_daily_rollup import LogDailyRollup
 from app.schemas.dashboard_schemas import tcodeGraph, systemIDGraph, criticalityDonutChart, \
-    auditClassSpagettiChart, EventCount  # You need to define this schema
-from sqlalchemy import and_, func, Date
+    auditClassSpagettiChart, EventCount, DashboardSummary  # You need to define this schema
+from sqlalchemy import and_, func, select, tuple_, Date
+from app.services.query_filters import apply_rollup_date_range
+from app.services.rollup_service import rollup_count
+from app.services.response_cache import dashboard_cache
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.get("/dashboard/tcode_onDate/", response_model=List[tcodeGraph])
+@dashboard_cache.cached
 async def filter_dashboard_by_t_code(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        if start_str and end_str:
-            if start_date > end_date:
-                raise HTTPException(status_code=400, detail="Start date must be before end date")
-
-        query = db.query(LogEntry.transaction_code, func.count().label("log_count"))
-        if start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        if end_str:
-            query = query.filter(LogEntry.date <= end_str)
-        query = query.filter(
-            and_(
-                LogEntry.transaction_code.isnot(None),
-                func.length(func.trim(LogEntry.transaction_code)) > 0
-            )
-        )
-        query = query.group_by(LogEntry.transaction_code).order_by(func.count().desc()).limit(10)
-
-        results = query.all()
+        query = select(LogDailyRollup.transaction_code, rollup_count().label("log_count"))
+        query = apply_rollup_date_range(query, start_date, end_date)
+        query = query.filter(func.length(func.trim(LogDailyRollup.transaction_code)) > 0)
+        query = query.group_by(LogDailyRollup.transaction_code).order_by(rollup_count().desc()).limit(10)
+
+        results = (await db.execute(query)).all()
 
         return [{"transaction_code": t_code, "log_count": count} for t_code, count in results]
 
@@ -49,29 +40,23 @@ async def filter_dashboard_by_t_code(
 
 
 @router.get("/dashboard/s_id_onDate/", response_model=List[systemIDGraph])
+@dashboard_cache.cached
 async def filter_dashboard_by_systemId(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        if start_str and end_str:
-            if start_date > end_date:
-                raise HTTPException(status_code=400, detail="Start date must be before end date")
-        query = db.query(LogEntry.sap_system_id, func.count().label("log_count_forSystem_id"))
+        query = select(LogDailyRollup.sap_system_id, rollup_count().label("log_count_forSystem_id"))
 
-        if start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        if end_str:
-            query = query.filter(LogEntry.date <= end_str)
-        query = query.group_by(LogEntry.sap_system_id).order_by(func.count().desc()).limit(10)
+        query = apply_rollup_date_range(query, start_date, end_date)
+        query = query.group_by(LogDailyRollup.sap_system_id).order_by(rollup_count().desc()).limit(10)
 
 
-        results = query.all()
+        results = (await db.execute(query)).all()
 
-        return [{"sap_system_id": sap_system_id, "log_count_forSystem_id": count} for sap_system_id, count in results]
+        return [{"sap_system_id": sap_system_id or None, "log_count_forSystem_id": count}
+                for sap_system_id, count in results]
 
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
@@ -81,28 +66,22 @@ async def filter_dashboard_by_systemId(
 
 
 @router.get("/dashboard/criticality_onDate/", response_model=List[criticalityDonutChart])
+@dashboard_cache.cached
 async def filter_dashboard_by_criticality(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        if start_str and end_str and start_date > end_date:
-            raise HTTPException(status_code=400, detail="Start date must be before end date")
-        query = db.query(LogEntry.criticality, func.count().label("criticality_log_count"))
+        query = select(LogDailyRollup.criticality, rollup_count().label("criticality_log_count"))
 
-        if start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        if end_str:
-            query = query.filter(LogEntry.date <= end_str)
-        query = query.group_by(LogEntry.criticality).order_by(func.count().desc())
+        query = apply_rollup_date_range(query, start_date, end_date)
+        query = query.group_by(LogDailyRollup.criticality).order_by(rollup_count().desc())
 
 
-        results = query.all()
+        results = (await db.execute(query)).all()
 
-        return [{"criticality": criticality, "criticality_log_count": count} for criticality, count in results]
+        return [{"criticality": criticality or None, "criticality_log_count": count} for criticality, count in results]
 
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
@@ -113,29 +92,23 @@ async def filter_dashboard_by_criticality(
 
 
 @router.get("/dashboard/auditclasses_onDate/", response_model=List[auditClassSpagettiChart])
+@dashboard_cache.cached
 async def filter_dashboard_by_auditclasses(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        if start_str and end_str and start_date > end_date:
-            raise HTTPException(status_code=400, detail="Start date must be before end date")
-        query = db.query(LogEntry.audit_class, func.count().label("audit_log_count"))
+        query = select(LogDailyRollup.audit_class, rollup_count().label("audit_log_count"))
 
-        if start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        if end_str:
-            query = query.filter(LogEntry.date <= end_str)
+        query = apply_rollup_date_range(query, start_date, end_date)
 
-        query = query.group_by(LogEntry.audit_class).order_by(func.count().desc())
+        query = query.group_by(LogDailyRollup.audit_class).order_by(rollup_count().desc())
 
 
-        results = query.all()
+        results = (await db.execute(query)).all()
 
-        return [{"audit_class": audit_class, "audit_log_count": count} for audit_class, count in results]
+        return [{"audit_class": audit_class or None, "audit_log_count": count} for audit_class, count in results]
 
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
@@ -144,25 +117,17 @@ async def filter_dashboard_by_auditclasses(
 
 
 @router.get("/home/totaleventCount/", response_model=EventCount)
+@dashboard_cache.cached
 async def filter_dashboard_by_t_code(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        if start_str and end_str:
-            if start_date > end_date:
-                raise HTTPException(status_code=400, detail="Start date must be before end date")
-
-        query = db.query(func.count().label("total_count"))
-        if start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        if end_str:
-            query = query.filter(LogEntry.date <= end_str)
-
-        total_count = query.scalar()
+        query = select(func.coalesce(rollup_count(), 0).label("total_count")).select_from(LogDailyRollup)
+        query = apply_rollup_date_range(query, start_date, end_date)
+
+        total_count = await db.scalar(query)
         return {"total_count": total_count}
 
     except ValueError as ve:
@@ -171,4 +136,53 @@ async def filter_dashboard_by_t_code(
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
+# GROUPING() bitmask over (transaction_code, sap_system_id, criticality,
+# audit_class) for each grouping set: 0 marks the column grouped on.
+SUMMARY_TCODES, SUMMARY_SYSTEMS, SUMMARY_CRITICALITY, SUMMARY_AUDIT_CLASSES, SUMMARY_TOTAL = 7, 11, 13, 14, 15
+
+
+@router.get("/dashboard/summary/", response_model=DashboardSummary)
+@dashboard_cache.cached
+async def dashboard_summary(
+        start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
+        end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        dimensions = (LogDailyRollup.transaction_code, LogDailyRollup.sap_system_id, LogDailyRollup.criticality,
+                      LogDailyRollup.audit_class)
+        query = select(func.grouping(*dimensions), *dimensions, rollup_count())
+        query = apply_rollup_date_range(query, start_date, end_date)
+        query = query.group_by(func.grouping_sets(*[tuple_(dimension) for dimension in dimensions], tuple_()))
+
+        groups = {}
+        for grouping, t_code, sap_system_id, criticality, audit_class, count in (await db.execute(query)).all():
+            groups.setdefault(grouping, []).append((t_code, sap_system_id, criticality, audit_class, count or 0))
+
+        def ranked(grouping, position, limit=None):
+            rows = sorted(groups.get(grouping, []), key=lambda row: row[-1], reverse=True)
+            return [(row[position] or None, row[-1]) for row in rows][:limit]
+
+        tcodes = [(t_code, count) for t_code, count in ranked(SUMMARY_TCODES, 0) if t_code and t_code.strip()]
+        total = groups.get(SUMMARY_TOTAL, [(None, None, None, None, 0)])[0][-1]
+
+        return {
+            "total_count": total,
+            "tcodes": [{"transaction_code": t_code, "log_count": count} for t_code, count in tcodes[:10]],
+            "systems": [{"sap_system_id": sap_system_id, "log_count_forSystem_id": count}
+                        for sap_system_id, count in ranked(SUMMARY_SYSTEMS, 1, 10)],
+            "criticality": [{"criticality": criticality, "criticality_log_count": count}
+                            for criticality, count in ranked(SUMMARY_CRITICALITY, 2)],
+            "audit_classes": [{"audit_class": audit_class, "audit_log_count": count}
+                              for audit_class, count in ranked(SUMMARY_AUDIT_CLASSES, 3)],
+        }
+
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 
+@router.get("/dashboard/cache/")
+async def dashboard_cache_stats():
+    return dashboard_cache.stats()
@@ -1,10 +1,10 @@
 import os
 from typing import List, Dict
-from fastapi.responses import Response
-import csv
-import io
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from fastapi import APIRouter, Depends, HTTPException, Form,Query,Depends
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi.responses import JSONResponse
 from datetime import datetime,date
@@ -13,112 +13,45 @@ from app.models.last_file_processed import lastfileEntry
 from app.schemas.log_schema import LogEntryResponse, LogEntryBase, FileCheckResponse
 from app.schemas.log_schema import LogEntryResponse
 
-from app.services.log_service import parse_and_store_logs
-from app.models.database import get_db
+from app.services.export_service import (CSV_EXPORT_COLUMNS, select_export_columns, select_parquet_columns,
+                                         open_export_rows, stream_csv, stream_parquet)
+from app.services.ingest_service import ingest_next_file, ingest_backlog, IngestionInProgress
+from app.services.query_filters import (apply_log_filters, newest_first, apply_cursor, encode_cursor, count_rows,
+                                        estimate_count, apply_search, matching_message_types, search_pattern,
+                                        archived_paths, SEARCH_MIN_LENGTH)
+from app.models.database import get_db, get_async_db
 from app.models.log import LogEntry
 from app.models.file_checker import FilecheckerEntry
 from app.models.file_path import filepathEntry
+from app.services.request_timing import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
+LOG_PAGE_SIZE = int(os.getenv("LOG_PAGE_SIZE", "500"))
+LOG_PAGE_SIZE_MAX = int(os.getenv("LOG_PAGE_SIZE_MAX", "5000"))
+
+# Ingestion handlers are plain functions: FastAPI runs them in its threadpool,
+# so parsing and the psycopg2 writes never block the event loop.
 @router.post("/process-folder/")
-async def process_folder(folder: str = Form(...), db: Session = Depends(get_db)):
+def process_folder(folder: str = Form(...), db: Session = Depends(get_db)):
     try:
         file_path_entry = db.query(filepathEntry).filter(filepathEntry.file_path.like(f"%{folder}%")).first()
         if not file_path_entry:
             raise HTTPException(status_code=400, detail="Invalid folder name")
         folder_path = file_path_entry.file_path
-        sap_system_id=file_path_entry.sap_system_id
-
-        def extract_timestamp(file_name: str):
-            try:
-                return datetime.strptime(file_name[:14], "%Y%m%d%H%M%S")
-            except ValueError:
-                return None
-        files = [
-            (os.path.join(folder_path, f), extract_timestamp(f))
-            for f in os.listdir(folder_path)
-            if os.path.isfile(os.path.join(folder_path, f)) and extract_timestamp(f) is not None
-        ]
-        sorted_files = sorted(files, key=lambda x: x[1])
-        last_processed_file = (
-            db.query(lastfileEntry)
-            .filter(
-                lastfileEntry.sap_system_id == file_path_entry.sap_system_id,
-                lastfileEntry.app_server_instance == file_path_entry.app_server_instance
-            )
-            .first()
-        )
-        last_processed_time = extract_timestamp(last_processed_file.file_name) if last_processed_file else None
 
-        file_to_process = None
-        for file in sorted_files:
-            file_time = file[1]
-            if last_processed_time is None or file_time > last_processed_time:
-                file_to_process = file
-                break
-
-        if not file_to_process:
+        result = ingest_next_file(db, file_path_entry)
+        if not result:
             return JSONResponse(status_code=200, content={"message": "No new files to process."})
 
-        file_path, file_timestamp = file_to_process
-        processed_count = 0
         errors = []
-
-        try:
-            success = parse_and_store_logs(
-                file_path=file_path,
-                db=db,
-                sap_system_id=file_path_entry.sap_system_id,
-                app_server_instance=file_path_entry.app_server_instance,
-                delimiter=file_path_entry.delimiter,
-                file_checker_id=None
-            )
-
-            if success:
-                processed_count = 1
-
-                existing_entry = (
-                    db.query(lastfileEntry)
-                    .filter(
-                        lastfileEntry.sap_system_id == file_path_entry.sap_system_id,
-                        lastfileEntry.app_server_instance == file_path_entry.app_server_instance
-                    )
-                    .first()
-                )
-
-                if existing_entry:
-                    existing_entry.file_name = os.path.basename(file_path)
-                    existing_entry.file_path = folder_path
-                    existing_entry.date_processed = datetime.now()
-                else:
-                    new_entry = lastfileEntry(
-                        sap_system_id=file_path_entry.sap_system_id,
-                        app_server_instance=file_path_entry.app_server_instance,
-                        file_name=os.path.basename(file_path),
-                        file_path=folder_path,
-                        date_processed=datetime.now()
-                    )
-                    db.add(new_entry)
-
-                file_checker_entry = FilecheckerEntry(
-                    last_file_processed=os.path.basename(file_path),
-                    file_path=folder_path,
-                    sap_system_id=sap_system_id,
-                    date=datetime.now(),
-                )
-                db.add(file_checker_entry)
-                db.commit()
-            else:
-                errors.append(f"Failed to parse: {os.path.basename(file_path)}")
-                db.rollback()
-
-        except Exception as e:
-            db.rollback()
-            errors.append(f"Error processing {os.path.basename(file_path)}: {str(e)}")
-            raise
-        finally:
-            db.close()
+        processed_count = 0
+        if result["success"]:
+            processed_count = 1
+        else:
+            # Batches committed before the failure stay in place; the next call
+            # resumes the same file from result["byte_offset"].
+            errors.append(f"Failed to parse: {result['file_name']}")
 
         return JSONResponse(
             status_code=200,
@@ -126,17 +59,58 @@ async def process_folder(folder: str = Form(...), db: Session = Depends(get_db))
                 "message": f"Processed {processed_count} files from {folder_path}",
                 "total_files": 1,
                 "processed": processed_count,
-                "errors": errors
+                "errors": errors,
+                "file_name": result["file_name"],
+                "resumed": result["resumed"],
+                "records_added": result["records_added"],
+                "duplicates_skipped": result["duplicates_skipped"],
+                "record_count": result["record_count"],
+                "byte_offset": result["byte_offset"],
+                "tail": result["tail"]
+            }
+        )
+
+    except IngestionInProgress as e:
+        return JSONResponse(status_code=409, content={"message": str(e)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
+
+@router.post("/process-folder/backlog/")
+def process_folder_backlog(
+        folder: str = Form(...),
+        max_workers: int = Form(None),
+        db: Session = Depends(get_db)
+):
+    try:
+        file_path_entry = db.query(filepathEntry).filter(filepathEntry.file_path.like(f"%{folder}%")).first()
+        if not file_path_entry:
+            raise HTTPException(status_code=400, detail="Invalid folder name")
+
+        summary = ingest_backlog(db, file_path_entry, max_workers=max_workers)
+        if not summary["pending_files"]:
+            return JSONResponse(status_code=200, content={"message": "No new files to process."})
+
+        errors = [f"Failed to parse: {result['file_name']}" for result in summary["files"] if not result["success"]]
+        return JSONResponse(
+            status_code=200,
+            content={
+                "message": f"Processed {summary['processed']} files from {file_path_entry.file_path}",
+                "total_files": summary["pending_files"],
+                "errors": errors,
+                **summary
             }
         )
 
+    except IngestionInProgress as e:
+        return JSONResponse(status_code=409, content={"message": str(e)})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
 @router.get("/get-systems")
-async def get_systems(db: Session = Depends(get_db)):
-    systems = db.query(filepathEntry).all()
+async def get_systems(db: AsyncSession = Depends(get_async_db)):
+    systems = (await db.execute(select(filepathEntry))).scalars().all()
     return [
         {
             "id": system.id,
@@ -149,16 +123,18 @@ async def get_systems(db: Session = Depends(get_db)):
 
 
 @router.get("/get-last-processed-files")
-async def get_last_processed_files(db: Session = Depends(get_db)):
-    last_processed_files = db.query(lastfileEntry).all()
+async def get_last_processed_files(db: AsyncSession = Depends(get_async_db)):
+    last_processed_files = (await db.execute(select(lastfileEntry))).scalars().all()
     return [
         {
             "sap_system_id" : last_processed_file.sap_system_id,
             "app_server_instance" : last_processed_file.app_server_instance,
             "file_name" : last_processed_file.file_name,
             "file_path": last_processed_file.file_path,
-            "date_processed" : last_processed_file.date_processed
-
+            "date_processed" : last_processed_file.date_processed,
+            "byte_offset": last_processed_file.byte_offset,
+            "record_count": last_processed_file.record_count,
+            "completed": last_processed_file.completed
         }
         for last_processed_file in last_processed_files
     ]
@@ -167,17 +143,17 @@ async def get_last_processed_files(db: Session = Depends(get_db)):
 async def get_files(
     date: date = Query(None),
     sap_system_id: str = Query(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        query = db.query(FilecheckerEntry)
+        query = select(FilecheckerEntry)
 
         if date:
             query = query.filter(func.date(FilecheckerEntry.date) == date)
         if sap_system_id:
             query = query.filter(FilecheckerEntry.sap_system_id == sap_system_id)
 
-        entries = query.all()
+        entries = (await db.execute(query)).scalars().all()
 
         results = []
         for entry in entries:
@@ -205,6 +181,31 @@ async def get_files(
 
 
 
+async def _log_page(db, query, filters, limit, cursor, exact_total):
+    total_logs = await (count_rows(db, query) if exact_total else estimate_count(db, query))
+
+    # One extra row tells whether another page follows.
+    logs = (await db.execute(newest_first(apply_cursor(query, cursor)).limit(limit + 1))).scalars().all()
+
+    # Archived parts of the range are read from Parquet and merged in.
+    paths = await archived_paths(db, filters["start_date"], filters["end_date"])
+    if paths:
+        # Only loaded once an archive exists; see archived_paths_query().
+        from app.services.archive_service import count_archive, merge_newest_first, query_archive
+
+        total_logs += await run_in_threadpool(count_archive, paths, filters)
+        archived = await run_in_threadpool(query_archive, paths, filters, cursor, limit + 1)
+        logs = merge_newest_first(logs, archived)[:limit + 1]
+    next_cursor = encode_cursor(logs[limit - 1]) if len(logs) > limit else None
+
+    return {
+        "total_logs": total_logs,
+        "total_is_estimate": not exact_total,
+        "next_cursor": next_cursor,
+        "logs": logs[:limit]
+    }
+
+
 @router.get("/logs/params/", response_model=LogEntryResponse)
 async def filter_logs_by_every_params(
         start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
@@ -214,45 +215,53 @@ async def filter_logs_by_every_params(
         criticality=Query(None),
         user=Query(None),
         sap_system_id=Query(None),
-        db: Session = Depends(get_db)
+        limit: int = Query(LOG_PAGE_SIZE, ge=1, le=LOG_PAGE_SIZE_MAX),
+        cursor: str = Query(None, description="next_cursor from the previous page"),
+        exact_total: bool = Query(False, description="Count matching rows exactly instead of estimating"),
+        db: AsyncSession = Depends(get_async_db)
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        query = db.query(LogEntry)
-
-        if start_str and end_str:
-            if start_date > end_date:
-                raise HTTPException(status_code=400, detail="Start date must be before end date")
-            query = query.filter(LogEntry.date >= start_str, LogEntry.date <= end_str)
-        elif start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        elif end_str:
-            query = query.filter(LogEntry.date <= end_str)
-        if t_code is not None:
-            query = query.filter(LogEntry.transaction_code == t_code)
-        if program is not None:
-            query = query.filter(LogEntry.program == program)
-        if criticality is not None:
-            query = query.filter(LogEntry.criticality == criticality)
-        if user is not None:
-            query = query.filter(LogEntry.user == user)
-        if sap_system_id is not None:
-            query= query.filter(LogEntry.sap_system_id ==sap_system_id)
-        total_logs = query.count()  # Get the total count
-        logs = query.order_by(LogEntry.date.desc(), LogEntry.time.desc()).all()
-
-        return {
-            "total_logs": total_logs,
-            "logs": logs
-        }
-
+        query = apply_log_filters(select(LogEntry), start_date, end_date, t_code, program, criticality, user,
+                                  sap_system_id)
+        filters = dict(start_date=start_date, end_date=end_date, t_code=t_code, program=program,
+                       criticality=criticality, user=user, sap_system_id=sap_system_id)
+        return await _log_page(db, query, filters, limit, cursor, exact_total)
+
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 
+@router.get("/logs/search", response_model=LogEntryResponse)
+async def search_logs(
+        q: str = Query(..., min_length=SEARCH_MIN_LENGTH,
+                       description="Text to find in the message, variables, terminal name or program"),
+        start_date: date = Query(None, description="Start date (YYYY-MM-DD)"),
+        end_date: date = Query(None, description="End date (YYYY-MM-DD)"),
+        sap_system_id=Query(None),
+        limit: int = Query(LOG_PAGE_SIZE, ge=1, le=LOG_PAGE_SIZE_MAX),
+        cursor: str = Query(None, description="next_cursor from the previous page"),
+        exact_total: bool = Query(False, description="Count matching rows exactly instead of estimating"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        pattern = search_pattern(q)
+        message_type_ids = (await db.execute(matching_message_types(pattern))).scalars().all()
+        query = apply_search(apply_log_filters(select(LogEntry), start_date, end_date, sap_system_id=sap_system_id),
+                             pattern, message_type_ids)
+        filters = dict(start_date=start_date, end_date=end_date, sap_system_id=sap_system_id, search=pattern)
+        return await _log_page(db, query, filters, limit, cursor, exact_total)
+
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Invalid date format: {str(ve)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
+
 
 
 
@@ -266,83 +275,56 @@ async def download_logs_as_csv(
         criticality: str = Query(None),
         user: str = Query(None),
         sap_system_id: str = Query(None),
-        db: Session = Depends(get_db)
+        columns: str = Query(None, description="Comma-separated CSV columns to export"),
+        gzip: bool = Query(False, description="Compress the export with gzip"),
+):
+    try:
+        headers = select_export_columns(columns)
+        filters = dict(start_date=start_date, end_date=end_date, t_code=t_code, program=program,
+                       criticality=criticality, user=user, sap_system_id=sap_system_id)
+        rows = await run_in_threadpool(open_export_rows, filters, [CSV_EXPORT_COLUMNS[header] for header in headers])
+        if rows is None:
+            return Response(content="No logs found for the given filters.", status_code=404)
+
+        filename = "logs.csv.gz" if gzip else "logs.csv"
+        return StreamingResponse(
+            stream_csv(headers, rows, compress=gzip),
+            media_type="application/gzip" if gzip else "text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    except HTTPException as e:
+        return Response(content=e.detail, status_code=e.status_code)
+    except Exception as e:
+        return Response(content=f"Server error: {str(e)}", status_code=500)
+
+
+@router.get("/logs/download/parquet/")
+async def download_logs_as_parquet(
+        start_date: date = Query(None),
+        end_date: date = Query(None),
+        t_code: str = Query(None),
+        program: str = Query(None),
+        criticality: str = Query(None),
+        user: str = Query(None),
+        sap_system_id: str = Query(None),
+        columns: str = Query(None, description="Comma-separated columns to export"),
 ):
     try:
-        start_str = start_date.strftime("%Y-%m-%d") if start_date else None
-        end_str = end_date.strftime("%Y-%m-%d") if end_date else None
-        query = db.query(LogEntry)
-
-        if start_str and end_str:
-            if start_date > end_date:
-                raise HTTPException(status_code=400, detail="Start date must be before end date")
-            query = query.filter(LogEntry.date >= start_str, LogEntry.date <= end_str)
-        elif start_str:
-            query = query.filter(LogEntry.date >= start_str)
-        elif end_str:
-            query = query.filter(LogEntry.date <= end_str)
-        if t_code is not None:
-            query = query.filter(LogEntry.transaction_code == t_code)
-        if program is not None:
-            query = query.filter(LogEntry.program == program)
-        if criticality is not None:
-            query = query.filter(LogEntry.criticality == criticality)
-        if user is not None:
-            query = query.filter(LogEntry.user == user)
-        if sap_system_id is not None:
-            query = query.filter(LogEntry.sap_system_id == sap_system_id)
-
-        logs = query.order_by(LogEntry.date.desc(), LogEntry.time.desc()).all()
-        if not logs:
+        attributes = select_parquet_columns(columns)
+        filters = dict(start_date=start_date, end_date=end_date, t_code=t_code, program=program,
+                       criticality=criticality, user=user, sap_system_id=sap_system_id)
+        rows = await run_in_threadpool(open_export_rows, filters, attributes)
+        if rows is None:
             return Response(content="No logs found for the given filters.", status_code=404)
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow([
-            "SAP_SYSTEM_ID", "APP_SERVER_INSTANCE", "MESSAGE_IDENTIFIER","MESSAGE_GROUP","SUB_CLASS","DATE","TIME","OS_NUMBER","WORK_PROCESS_NUMBER",
-            "SAP_PROCESS","CLIENT","FILE_NUMBER","SHORT_TERMINAL_NAME" ,"USER", "TRANSACTION_CODE",
-                         "PROGRAM", "LONG_TERMINAL_NAME", "LAST_ADDRESS_ROUTED","FIRST_VARIABLE","SECOND_VARIABLE","THIRD_VARIABLE",
-            "AUDIT_LOG_MSG","AUDIT_CLASS","MSG_SEVERITY","CRITICALITY","OTHER_VARIABLES"])
-
-        for log in logs:
-
-            writer.writerow([
-                log.sap_system_id or "",
-                log.app_server_instance or "",
-                log.message_identifier or "",
-                log.syslog_msg_group or "",
-                log.sub_name or "",
-                log.date or "",
-                log.time or "",
-                log.operating_system_number or "",
-                log.work_process_number or "",
-                log.sap_process or "",
-                log.client or "",
-                log.file_number or "",
-                log.short_terminal_name or "",
-                log.user or "",
-                log.transaction_code or "",
-                log.program or "",
-                log.long_terminal_name or "",
-                log.last_address_routed_no_of_variables or "",
-                log.first_variable_value or "",
-                log.second_variable_value or "",
-                log.third_variable_value or "",
-                log.audit_log_msg_text or "",
-                log.audit_class or "",
-                log.message_severity or "",
-                log.criticality or "",
-                log.other_variable_values or ""
-
-            ])
-
-        output.seek(0)
-
-        return Response(
-            content=output.getvalue(),
-            media_type="text/csv",
-            headers={"Content-Disposition": 'attachment; filename="logs.csv"'}
+
+        return StreamingResponse(
+            stream_parquet(attributes, rows),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": 'attachment; filename="logs.parquet"'}
         )
 
+    except HTTPException as e:
+        return Response(content=e.detail, status_code=e.status_code)
     except Exception as e:
         return Response(content=f"Server error: {str(e)}", status_code=500)
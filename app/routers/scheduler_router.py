@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app.services.scheduler import scheduler
+from app.services.watcher import watcher
+from app.services.request_timing import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/scheduler/status")
+async def get_scheduler_status():
+    return {**scheduler.status(), "watcher": watcher.status()}
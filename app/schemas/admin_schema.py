@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+
+
+class ProfilingConfig(BaseModel):
+    route: str
+    sample_rate: float = Field(0.01, gt=0, le=1)
+    max_profiles: int = Field(20, ge=1, le=1000)
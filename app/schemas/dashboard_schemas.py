@@ -1,3 +1,5 @@
+from typing import List
+
 from pydantic import BaseModel
 
 class BaseORMModel(BaseModel):
@@ -22,3 +24,10 @@ class auditClassSpagettiChart(BaseORMModel):
 
 class EventCount(BaseORMModel):
     total_count: int
+
+class DashboardSummary(BaseORMModel):
+    total_count: int
+    tcodes: List[tcodeGraph]
+    systems: List[systemIDGraph]
+    criticality: List[criticalityDonutChart]
+    audit_classes: List[auditClassSpagettiChart]
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel
 from datetime import date
@@ -12,6 +12,7 @@ class LogEntryBase(BaseModel):
     sub_name: str
     date: str
     time: str
+    event_timestamp: Optional[datetime] = None
     operating_system_number: str
     work_process_number: str
     sap_process :str
@@ -32,7 +33,8 @@ class LogEntryBase(BaseModel):
     message_severity: str
     criticality: str
     other_variable_values: str
-    
+    record_hash: Optional[str] = None
+
 
     class Config:
         orm_mode = True
@@ -41,6 +43,8 @@ class LogEntryBase(BaseModel):
 
 class LogEntryResponse(BaseModel):
     total_logs: int
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None
     logs: List[LogEntryBase]
 
 
@@ -0,0 +1,240 @@
+import argparse
+import heapq
+import os
+from datetime import date, datetime, time, timedelta
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import delete, insert, inspect, select, text
+
+from app.models.database import engine
+from app.models.log import SEARCH_COLUMNS, LogEntry
+from app.models.log_archive import LogArchive
+from app.models.log_daily_rollup import LogDailyRollup
+from app.services.partition_service import (LOG_ARCHIVE_AFTER_DAYS, LOG_RETENTION_DAYS, PARENT_TABLE, list_partitions,
+                                            partition_cache)
+from app.services.query_filters import SEARCH_ESCAPE, date_range_bounds, decode_cursor
+from app.services.response_cache import data_generation
+
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", os.path.join(os.getcwd(), "archive"))
+LOG_ARCHIVE_BATCH_SIZE = int(os.getenv("LOG_ARCHIVE_BATCH_SIZE", "50000"))
+LOG_ARCHIVE_COMPRESSION = os.getenv("LOG_ARCHIVE_COMPRESSION", "zstd")
+
+# Archives hold the rows as LogEntry reads them, with dimension values and the
+# rendered message text, so every file can be read on its own.
+ARCHIVE_COLUMNS = [attribute.key for attribute in inspect(LogEntry).column_attrs]
+ARCHIVE_SCHEMA = pa.schema([
+    (name, pa.int64() if name == "id" else pa.timestamp("us") if name == "event_timestamp" else pa.string())
+    for name in ARCHIVE_COLUMNS
+])
+# Query parameter -> column, as in apply_log_filters.
+ARCHIVE_FILTER_COLUMNS = {
+    "t_code": "transaction_code",
+    "program": "program",
+    "criticality": "criticality",
+    "user": "user",
+    "sap_system_id": "sap_system_id",
+}
+# Archives keep the rendered message text, so it is searched directly.
+ARCHIVE_SEARCH_COLUMNS = ("audit_log_msg_text",) + SEARCH_COLUMNS
+NEWEST_FIRST = " ORDER BY event_timestamp DESC, id DESC"
+
+ARCHIVE_ROLLUP = """
+    SELECT CAST(event_timestamp AS DATE),
+           coalesce(sap_system_id, ''),
+           coalesce(transaction_code, ''),
+           coalesce(criticality, ''),
+           coalesce(audit_class, ''),
+           count(*)
+    FROM {source}
+    WHERE event_timestamp IS NOT NULL
+    GROUP BY ALL
+"""
+
+
+def archive_partition(bind, name, start, end, directory=LOG_ARCHIVE_DIR):
+    # Rows are written sorted by event_timestamp, so row group statistics let
+    # the engine skip most of a file for narrow date ranges. The partition is
+    # only dropped in the transaction that records the finished file.
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}_{datetime.now():%Y%m%d%H%M%S}.parquet")
+    partial = path + ".partial"
+    rows = 0
+    try:
+        with bind.begin() as connection:
+            # Ingests into this range wait until the partition is gone.
+            connection.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+            result = connection.execute(
+                select(*[getattr(LogEntry, column) for column in ARCHIVE_COLUMNS])
+                .where(LogEntry.event_timestamp >= start, LogEntry.event_timestamp < end)
+                .order_by(LogEntry.event_timestamp, LogEntry.id)
+                .execution_options(stream_results=True, yield_per=LOG_ARCHIVE_BATCH_SIZE)
+            )
+            writer = None
+            for batch in result.partitions():
+                if writer is None:
+                    writer = pq.ParquetWriter(partial, ARCHIVE_SCHEMA, compression=LOG_ARCHIVE_COMPRESSION)
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(zip(*batch), ARCHIVE_SCHEMA)],
+                    schema=ARCHIVE_SCHEMA
+                ))
+                rows += len(batch)
+            if writer is not None:
+                writer.close()
+                os.replace(partial, path)
+                connection.execute(insert(LogArchive).values(
+                    partition_name=name, range_start=start, range_end=end, path=path, row_count=rows
+                ))
+            connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"'))
+            connection.execute(text(f'DROP TABLE "{name}"'))
+    except Exception:
+        for leftover in (partial, path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+    finally:
+        partition_cache.reset()
+    return rows
+
+
+def archive_expired_partitions(bind=engine, after_days=LOG_ARCHIVE_AFTER_DAYS, today=None):
+    # The daily rollup keeps the archived counts, so the dashboard does not
+    # change when rows move to the archive.
+    if after_days <= 0:
+        return []
+    cutoff = datetime.combine((today or date.today()) - timedelta(days=after_days), time.min)
+    with bind.connect() as connection:
+        expired = [partition for partition in list_partitions(connection) if partition[2] <= cutoff]
+    archived = []
+    for name, start, end in expired:
+        rows = archive_partition(bind, name, start, end)
+        archived.append(name)
+        print(f"Archived {name}: {rows} rows")
+    return archived
+
+
+def expire_archives(bind=engine, retention_days=LOG_RETENTION_DAYS, today=None):
+    # The retention policy covers archived ranges too.
+    if retention_days <= 0:
+        return []
+    cutoff = datetime.combine((today or date.today()) - timedelta(days=retention_days), time.min)
+    with bind.begin() as connection:
+        expired = connection.execute(select(LogArchive).where(LogArchive.range_end <= cutoff)).all()
+        for archive in expired:
+            connection.execute(delete(LogArchive).where(LogArchive.id == archive.id))
+            connection.execute(delete(LogDailyRollup).where(
+                LogDailyRollup.event_date >= archive.range_start.date(),
+                LogDailyRollup.event_date < archive.range_end.date()
+            ))
+    for archive in expired:
+        if os.path.exists(archive.path):
+            os.remove(archive.path)
+    if expired:
+        data_generation.bump()
+    return [archive.path for archive in expired]
+
+
+def run_archive_maintenance(bind=engine):
+    return {"archived": archive_expired_partitions(bind), "expired_archives": expire_archives(bind)}
+
+
+def _source(paths):
+    # union_by_name reads files archived before a column existed as NULLs.
+    return "read_parquet([{}], union_by_name = true)".format(", ".join("'{}'".format(path.replace("'", "''")) for path in paths))
+
+
+def _archive_where(filters, cursor=None):
+    clauses = []
+    params = []
+    start, end = date_range_bounds(filters.get("start_date"), filters.get("end_date"))
+    if start:
+        clauses.append("event_timestamp >= ?")
+        params.append(start)
+    if end:
+        clauses.append("event_timestamp < ?")
+        params.append(end)
+    for name, column in ARCHIVE_FILTER_COLUMNS.items():
+        if filters.get(name) is not None:
+            clauses.append(f'"{column}" = ?')
+            params.append(filters[name])
+    if filters.get("search"):
+        clauses.append("(" + " OR ".join(f'"{column}" ILIKE ? ESCAPE \'{SEARCH_ESCAPE}\''
+                                         for column in ARCHIVE_SEARCH_COLUMNS) + ")")
+        params += [filters["search"]] * len(ARCHIVE_SEARCH_COLUMNS)
+    if cursor:
+        # Archived rows always have a timestamp, so they all follow a cursor
+        # that points into the NULL-timestamp rows.
+        timestamp, entry_id = decode_cursor(cursor)
+        if timestamp is not None:
+            clauses.append("(event_timestamp < ? OR (event_timestamp = ? AND id < ?))")
+            params += [timestamp, timestamp, entry_id]
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def count_archive(paths, filters):
+    where, params = _archive_where(filters)
+    with duckdb.connect() as connection:
+        return connection.execute(f"SELECT count(*) FROM {_source(paths)}{where}", params).fetchone()[0]
+
+
+def query_archive(paths, filters, cursor=None, limit=None):
+    # Rows come back as detached LogEntry objects, so they serialize and build
+    # cursors exactly like rows from log_entries.
+    # Columns added after a file was archived are simply absent from it.
+    where, params = _archive_where(filters, cursor)
+    statement = f"SELECT * FROM {_source(paths)}{where}{NEWEST_FIRST}"
+    if limit is not None:
+        statement += f" LIMIT {int(limit)}"
+    with duckdb.connect() as connection:
+        result = connection.execute(statement, params)
+        names = [column[0] for column in result.description]
+        rows = result.fetchall()
+    known = set(ARCHIVE_COLUMNS)
+    return [LogEntry(**{name: value for name, value in zip(names, row) if name in known}) for row in rows]
+
+
+def archive_export_rows(paths, filters, attributes, batch_size=LOG_ARCHIVE_BATCH_SIZE):
+    # Yields the requested attributes followed by event_timestamp and id, the
+    # sort key merge_export_rows() needs.
+    where, params = _archive_where(filters)
+    columns = ", ".join(f'"{column}"' for column in list(attributes) + ["event_timestamp", "id"])
+    connection = duckdb.connect()
+    try:
+        result = connection.execute(f"SELECT {columns} FROM {_source(paths)}{where}{NEWEST_FIRST}", params)
+        while True:
+            batch = result.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+    finally:
+        connection.close()
+
+
+def newest_first_key(entry):
+    # Same order as newest_first(): NULL timestamps first, then by timestamp
+    # and id, all descending.
+    return entry.event_timestamp is None, entry.event_timestamp or datetime.min, entry.id
+
+
+def merge_newest_first(*entries):
+    return sorted((entry for group in entries for entry in group), key=newest_first_key, reverse=True)
+
+
+def merge_export_rows(*sources):
+    # Each source is ordered newest first and ends with (event_timestamp, id).
+    merged = heapq.merge(*sources, key=lambda row: (row[-2] is None, row[-2] or datetime.min, row[-1]),
+                         reverse=True)
+    return (row[:-2] for row in merged)
+
+
+def archive_rollup_counts(paths):
+    with duckdb.connect() as connection:
+        return connection.execute(ARCHIVE_ROLLUP.format(source=_source(paths))).fetchall()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--after-days", type=int, default=LOG_ARCHIVE_AFTER_DAYS)
+    args = arg_parser.parse_args()
+    print(archive_expired_partitions(after_days=args.after_days))
@@ -0,0 +1,277 @@
+import argparse
+import threading
+
+from sqlalchemy import column, func, select, table, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.database import engine
+from app.models.log import MESSAGE_PLACEHOLDERS, StoredLogEntry, render_message_text
+from app.models.message_type import MessageType
+from app.models.sap_instance import SapInstance
+from app.services.message_catalog import MESSAGE_CATALOG
+
+MESSAGE_TYPE_COLUMNS = ("syslog_msg_group", "sub_name", "message_text", "audit_class", "message_severity",
+                        "criticality")
+# Columns of the layout before normalization, moved into the dimension tables.
+DENORMALIZED_COLUMNS = ("sap_system_id", "app_server_instance", "message_identifier", "syslog_msg_group",
+                        "sub_name", "audit_log_msg_text", "audit_class", "message_severity", "criticality")
+PARENT_TABLE = StoredLogEntry.__tablename__
+NORMALIZE_BATCH_SIZE = 50000
+
+# The parser filled every placeholder up to the number of event
+# variables, which was not stored. Rows without variables have no
+# variable values at all; the others are taken to have as many variables
+# as their template has placeholders, or more if other_variable_values
+# says so. Rows are keyed in batches, each committed on its own.
+FILL_DIMENSION_KEYS = text(f"""
+    UPDATE "{PARENT_TABLE}" AS entry
+    SET instance_id = instance.id,
+        message_type_id = message_type.id,
+        variable_count = CASE
+            WHEN entry.first_variable_value IS NULL THEN 0
+            ELSE greatest(
+                message_type.placeholders, 1,
+                CASE WHEN coalesce(entry.other_variable_values, '') <> ''
+                    THEN 4 + length(entry.other_variable_values)
+                           - length(replace(entry.other_variable_values, '&', ''))
+                    ELSE 0
+                END
+            )
+        END
+    FROM sap_instances AS instance, (
+        SELECT id, message_identifier,
+               (SELECT coalesce(max(position), 0) FROM generate_series(1, {len(MESSAGE_PLACEHOLDERS)}) AS position
+                WHERE strpos(message_text, '&' || chr(64 + position)) > 0) AS placeholders
+        FROM message_types
+    ) AS message_type
+    WHERE instance.sap_system_id = coalesce(entry.sap_system_id, '')
+      AND instance.app_server_instance = coalesce(entry.app_server_instance, '')
+      AND message_type.message_identifier = coalesce(entry.message_identifier, '')
+      AND entry.id IN (SELECT id FROM "{PARENT_TABLE}" WHERE instance_id IS NULL LIMIT :batch_size)
+""")
+
+
+def message_type_rows(catalog=MESSAGE_CATALOG):
+    return [
+        {
+            "message_identifier": message_id,
+            "syslog_msg_group": message_id[:2],
+            "sub_name": message_id[2:3],
+            "message_text": template["message_text"],
+            "audit_class": template["audit_class"],
+            "message_severity": template["message_severity"],
+            "criticality": template["criticality"],
+        }
+        for message_id, template in catalog.templates.items()
+    ]
+
+
+def sync_message_types(bind=engine, catalog=MESSAGE_CATALOG):
+    # Templates follow the catalog, so stored entries render with its current
+    # text. Existing rows are updated rather than upserted: every INSERT that
+    # hits a conflict would still use up a value of the smallint sequence.
+    with bind.begin() as connection:
+        existing = {row.message_identifier: row for row in connection.execute(select(MessageType)).mappings()}
+        missing = []
+        for row in message_type_rows(catalog):
+            current = existing.get(row["message_identifier"])
+            if current is None:
+                missing.append(row)
+            elif any(current[name] != row[name] for name in MESSAGE_TYPE_COLUMNS):
+                connection.execute(update(MessageType).where(
+                    MessageType.message_identifier == row["message_identifier"]
+                ).values(**row))
+        if missing:
+            connection.execute(insert(MessageType).on_conflict_do_nothing(index_elements=["message_identifier"]),
+                               missing)
+    dimension_cache.reset()
+
+
+class DimensionCache:
+    # Dimension keys for the ingest path. New rows are committed in their own
+    # transaction, so a key handed to a batch that is rolled back still exists
+    # for the next one.
+    def __init__(self):
+        self._instances = {}
+        self._message_types = None
+        self._lock = threading.Lock()
+
+    def instance_id(self, bind, sap_system_id, app_server_instance):
+        key = (sap_system_id or "", app_server_instance or "")
+        with self._lock:
+            if key in self._instances:
+                return self._instances[key]
+        lookup = select(SapInstance.id).where(SapInstance.sap_system_id == key[0],
+                                              SapInstance.app_server_instance == key[1])
+        with bind.begin() as connection:
+            instance_id = connection.execute(lookup).scalar()
+            if instance_id is None:
+                connection.execute(insert(SapInstance).values(
+                    sap_system_id=key[0], app_server_instance=key[1]
+                ).on_conflict_do_nothing())
+                instance_id = connection.execute(lookup).scalar_one()
+        with self._lock:
+            self._instances[key] = instance_id
+        return instance_id
+
+    def message_type_ids(self, bind, catalog=MESSAGE_CATALOG):
+        # message_identifier -> id for every message ID in the catalog.
+        with self._lock:
+            message_types = self._message_types
+        if message_types is None or any(message_id not in message_types for message_id in catalog.templates):
+            with bind.connect() as connection:
+                message_types = dict(connection.execute(select(MessageType.message_identifier, MessageType.id)).all())
+            if any(message_id not in message_types for message_id in catalog.templates):
+                sync_message_types(bind, catalog)
+                return self.message_type_ids(bind, catalog)
+            with self._lock:
+                self._message_types = message_types
+        return message_types
+
+    def reset(self):
+        with self._lock:
+            self._instances = {}
+            self._message_types = None
+
+
+dimension_cache = DimensionCache()
+
+
+def _column_types(connection):
+    return dict(connection.execute(text(
+        "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = :table"
+    ), {"table": PARENT_TABLE}).all())
+
+
+def needs_normalization(connection):
+    # log_entries still has the layout from before the dimension tables.
+    columns = _column_types(connection)
+    return "message_identifier" in columns or columns.get("record_hash", "bytea") != "bytea"
+
+
+def normalize_log_entries(bind=engine, batch_size=NORMALIZE_BATCH_SIZE):
+    # One-time conversion of log_entries written before the dimension tables:
+    # keys are filled in from the stored values and the value columns dropped.
+    # Run with the API and ingestion stopped. Every step commits on its own
+    # and skips work already done, so an interrupted run is simply started
+    # again.
+    with bind.connect() as connection:
+        if not needs_normalization(connection):
+            return 0
+        columns = _column_types(connection)
+
+    print(f"Normalizing {PARENT_TABLE}")
+    rows = 0
+    if "message_identifier" in columns:
+        rows = _move_to_dimensions(bind, batch_size)
+    # Converting record_hash to bytea rewrites every partition, which also
+    # gives back the space the dropped columns took.
+    with bind.begin() as connection:
+        if _column_types(connection)["record_hash"] != "bytea":
+            connection.execute(text(
+                f'ALTER TABLE "{PARENT_TABLE}" ALTER COLUMN record_hash TYPE bytea USING decode(record_hash, \'hex\')'
+            ))
+        connection.execute(text(f'ANALYZE "{PARENT_TABLE}"'))
+    dimension_cache.reset()
+    print(f"Normalized {PARENT_TABLE}: {rows} rows")
+    return rows
+
+
+def _legacy_entries():
+    # log_entries as it was before normalization, for the columns the
+    # conversion reads.
+    return table(PARENT_TABLE, *[column(name) for name in (
+        "message_type_id", "variable_count", "first_variable_value", "second_variable_value",
+        "third_variable_value", "other_variable_values", "audit_log_msg_text", "message_text_override",
+    )])
+
+
+def _move_to_dimensions(bind, batch_size):
+    with bind.begin() as connection:
+        for name in ("instance_id", "message_type_id", "variable_count"):
+            connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" ADD COLUMN IF NOT EXISTS {name} SMALLINT'))
+        connection.execute(text(
+            f'ALTER TABLE "{PARENT_TABLE}" ADD COLUMN IF NOT EXISTS message_text_override VARCHAR'
+        ))
+        _add_dimension_rows(connection)
+
+    rows = 0
+    while True:
+        with bind.begin() as connection:
+            rowcount = connection.execute(FILL_DIMENSION_KEYS, {"batch_size": batch_size}).rowcount
+        rows += rowcount
+        print(f"Keyed {rows} rows")
+        if rowcount < batch_size:
+            break
+
+    with bind.begin() as connection:
+        _keep_unreproduced_text(connection)
+    with bind.begin() as connection:
+        _drop_denormalized_columns(connection)
+    return rows
+
+
+def _add_dimension_rows(connection):
+    connection.execute(text(f"""
+        INSERT INTO sap_instances (sap_system_id, app_server_instance)
+        SELECT DISTINCT coalesce(sap_system_id, ''), coalesce(app_server_instance, '') FROM "{PARENT_TABLE}"
+        EXCEPT
+        SELECT sap_system_id, app_server_instance FROM sap_instances
+    """))
+    # Message IDs no longer in the catalog take their most common stored text
+    # as the template; rows it does not reproduce keep their own text below.
+    connection.execute(text(f"""
+        INSERT INTO message_types (message_identifier, syslog_msg_group, sub_name, message_text, audit_class,
+                                   message_severity, criticality)
+        SELECT coalesce(message_identifier, ''), coalesce(left(min(message_identifier), 2), ''),
+               coalesce(substr(min(message_identifier), 3, 1), ''),
+               mode() WITHIN GROUP (ORDER BY audit_log_msg_text), min(audit_class), min(message_severity),
+               min(criticality)
+        FROM "{PARENT_TABLE}"
+        WHERE coalesce(message_identifier, '') NOT IN (SELECT message_identifier FROM message_types)
+        GROUP BY coalesce(message_identifier, '')
+    """))
+
+
+def _keep_unreproduced_text(connection):
+    # Where rendering does not give back the stored text (fewer variables
+    # than placeholders, or a template guessed from stored text), the stored
+    # text is kept. Rows without stored text had no catalog entry when they
+    # were parsed and simply gain the rendered one.
+    entries = _legacy_entries()
+    rendered = func.coalesce(entries.c.message_text_override,
+                             render_message_text(MessageType.__table__.c.message_text, entries))
+    differs = rendered.is_distinct_from(entries.c.audit_log_msg_text)
+    connection.execute(update(entries).values(message_text_override=entries.c.audit_log_msg_text).where(
+        entries.c.message_type_id == MessageType.__table__.c.id, entries.c.audit_log_msg_text.isnot(None), differs
+    ))
+    unreproduced = connection.execute(select(func.count()).select_from(entries).join(
+        MessageType.__table__, entries.c.message_type_id == MessageType.__table__.c.id
+    ).where(entries.c.audit_log_msg_text.isnot(None), differs)).scalar()
+    if unreproduced:
+        raise RuntimeError(f"{unreproduced} rows of {PARENT_TABLE} would change their message text")
+    overrides = connection.execute(select(func.count()).select_from(entries).where(
+        entries.c.message_text_override.isnot(None)
+    )).scalar()
+    print(f"Kept the stored message text of {overrides} rows")
+
+
+def _drop_denormalized_columns(connection):
+    for name in DENORMALIZED_COLUMNS:
+        connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" DROP COLUMN IF EXISTS {name}'))
+    for name in ("instance_id", "message_type_id", "variable_count"):
+        connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" ALTER COLUMN {name} SET NOT NULL'))
+    connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" ALTER COLUMN variable_count SET DEFAULT 0'))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("command", choices=("check", "normalize"))
+    arg_parser.add_argument("--batch-size", type=int, default=NORMALIZE_BATCH_SIZE)
+    args = arg_parser.parse_args()
+
+    if args.command == "check":
+        with engine.connect() as connection:
+            print("needs normalization" if needs_normalization(connection) else "normalized")
+    else:
+        print(normalize_log_entries(batch_size=args.batch_size))
@@ -0,0 +1,222 @@
+import csv
+import io
+import os
+import zlib
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+
+from app.models.database import SessionLocal
+from app.models.log import LogEntry
+from app.services.query_filters import apply_log_filters, archived_paths_query, newest_first
+
+EXPORT_BATCH_SIZE = int(os.getenv("LOG_EXPORT_BATCH_SIZE", "5000"))
+EXPORT_CHUNK_SIZE = 64 * 1024
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("LOG_PARQUET_ROW_GROUP_SIZE", "50000"))
+PARQUET_COMPRESSION = os.getenv("LOG_PARQUET_COMPRESSION", "zstd")
+
+# CSV header -> LogEntry column, in export order.
+CSV_EXPORT_COLUMNS = {
+    "SAP_SYSTEM_ID": "sap_system_id",
+    "APP_SERVER_INSTANCE": "app_server_instance",
+    "MESSAGE_IDENTIFIER": "message_identifier",
+    "MESSAGE_GROUP": "syslog_msg_group",
+    "SUB_CLASS": "sub_name",
+    "DATE": "date",
+    "TIME": "time",
+    "OS_NUMBER": "operating_system_number",
+    "WORK_PROCESS_NUMBER": "work_process_number",
+    "SAP_PROCESS": "sap_process",
+    "CLIENT": "client",
+    "FILE_NUMBER": "file_number",
+    "SHORT_TERMINAL_NAME": "short_terminal_name",
+    "USER": "user",
+    "TRANSACTION_CODE": "transaction_code",
+    "PROGRAM": "program",
+    "LONG_TERMINAL_NAME": "long_terminal_name",
+    "LAST_ADDRESS_ROUTED": "last_address_routed_no_of_variables",
+    "FIRST_VARIABLE": "first_variable_value",
+    "SECOND_VARIABLE": "second_variable_value",
+    "THIRD_VARIABLE": "third_variable_value",
+    "AUDIT_LOG_MSG": "audit_log_msg_text",
+    "AUDIT_CLASS": "audit_class",
+    "MSG_SEVERITY": "message_severity",
+    "CRITICALITY": "criticality",
+    "OTHER_VARIABLES": "other_variable_values",
+}
+
+# Parquet columns use the model names and keep event_timestamp typed.
+PARQUET_EXPORT_COLUMNS = {attribute: pa.string() for attribute in CSV_EXPORT_COLUMNS.values()}
+PARQUET_EXPORT_COLUMNS["event_timestamp"] = pa.timestamp("us")
+# Low-cardinality columns; the rest are written plain, where a dictionary
+# would only overflow and fall back anyway.
+PARQUET_DICTIONARY_COLUMNS = (
+    "sap_system_id", "app_server_instance", "message_identifier", "syslog_msg_group", "sub_name", "date",
+    "operating_system_number", "sap_process", "client", "user", "transaction_code", "program",
+    "audit_class", "message_severity", "criticality",
+)
+
+
+def select_export_columns(columns: str = None):
+    # Accepts CSV headers or model column names, comma separated.
+    if not columns:
+        return list(CSV_EXPORT_COLUMNS)
+    by_attribute = {attribute: header for header, attribute in CSV_EXPORT_COLUMNS.items()}
+    selected = []
+    for name in (name.strip() for name in columns.split(",")):
+        header = name.upper() if name.upper() in CSV_EXPORT_COLUMNS else by_attribute.get(name.lower())
+        if header is None:
+            raise HTTPException(status_code=400, detail=f"Unknown column: {name}")
+        if header not in selected:
+            selected.append(header)
+    return selected
+
+
+def select_parquet_columns(columns: str = None):
+    # Accepts model column names or CSV headers, comma separated.
+    if not columns:
+        return list(PARQUET_EXPORT_COLUMNS)
+    selected = []
+    for name in (name.strip() for name in columns.split(",")):
+        attribute = CSV_EXPORT_COLUMNS.get(name.upper(), name.lower())
+        if attribute not in PARQUET_EXPORT_COLUMNS:
+            raise HTTPException(status_code=400, detail=f"Unknown column: {name}")
+        if attribute not in selected:
+            selected.append(attribute)
+    return selected
+
+
+def open_export_rows(filters, attributes, batch_size=EXPORT_BATCH_SIZE):
+    # The export outlives the request's session, so it owns one. stream_results
+    # makes psycopg2 use a named (server-side) cursor that is read in batches.
+    db = SessionLocal()
+    sources = []
+    try:
+        paths = db.execute(archived_paths_query(filters["start_date"], filters["end_date"])).scalars().all()
+        columns = [getattr(LogEntry, attribute) for attribute in attributes]
+        if paths:
+            # Archived ranges are read by DuckDB and merged in by sort key.
+            columns += [LogEntry.event_timestamp, LogEntry.id]
+        query = newest_first(apply_log_filters(db.query(*columns), **filters))
+        rows = iter(query.execution_options(stream_results=True, yield_per=batch_size))
+        if paths:
+            from app.services.archive_service import archive_export_rows, merge_export_rows
+
+            sources.append(archive_export_rows(paths, filters, attributes, batch_size))
+            rows = merge_export_rows(rows, sources[0])
+        first_row = next(rows, None)
+    except Exception:
+        _close(db, sources)
+        raise
+    if first_row is None:
+        _close(db, sources)
+        return None
+    return _export_rows(db, sources, first_row, rows)
+
+
+def _close(db, sources):
+    for source in sources:
+        source.close()
+    db.close()
+
+
+def _export_rows(db, sources, first_row, rows):
+    try:
+        yield first_row
+        yield from rows
+    finally:
+        _close(db, sources)
+
+
+def stream_csv(headers, rows, compress=False):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def flush(sync=False):
+        data = output.getvalue().encode("utf-8")
+        output.seek(0)
+        output.truncate()
+        if not compressor:
+            return data
+        # A sync flush pushes the header out immediately instead of waiting
+        # for the compressor to fill a block.
+        return compressor.compress(data) + (compressor.flush(zlib.Z_SYNC_FLUSH) if sync else b"")
+
+    try:
+        writer.writerow(headers)
+        yield flush(sync=True)
+        for row in rows:
+            writer.writerow(row)
+            if output.tell() >= EXPORT_CHUNK_SIZE:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        chunk = flush()
+        if compressor:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        # Releases the server-side cursor when the client disconnects early.
+        rows.close()
+
+
+class ParquetChunkSink(io.RawIOBase):
+    # Write-only file that ParquetWriter fills and the response drains after
+    # every row group.
+    def __init__(self):
+        super().__init__()
+        self.buffer = bytearray()
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def stream_parquet(attributes, rows, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    schema = pa.schema([(attribute, PARQUET_EXPORT_COLUMNS[attribute]) for attribute in attributes])
+    sink = ParquetChunkSink()
+    writer = pq.ParquetWriter(
+        sink,
+        schema,
+        compression=PARQUET_COMPRESSION,
+        use_dictionary=[attribute for attribute in attributes if attribute in PARQUET_DICTIONARY_COLUMNS]
+    )
+
+    def write_row_group(batch):
+        columns = zip(*batch)
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ), row_group_size=row_group_size)
+        return sink.drain()
+
+    try:
+        yield sink.drain()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= row_group_size:
+                yield write_row_group(batch)
+                batch = []
+        if batch:
+            yield write_row_group(batch)
+        writer.close()
+        yield sink.drain()
+    finally:
+        rows.close()
@@ -0,0 +1,343 @@
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.models.file_checker import FilecheckerEntry
+from app.models.file_path import filepathEntry
+from app.models.last_file_processed import lastfileEntry
+from app.services.log_service import LogParser
+from app.services.metrics import observe_parse, observe_file, set_files_pending
+
+BACKLOG_MAX_WORKERS = int(os.getenv("BACKLOG_MAX_WORKERS", "0")) or os.cpu_count() or 1
+# Workers spill parsed records to temporary files in batches of this size, so
+# neither side holds a whole parsed file in memory.
+BACKLOG_SPILL_BATCH_SIZE = int(os.getenv("BACKLOG_SPILL_BATCH_SIZE", "10000"))
+BACKLOG_SPILL_DIR = os.getenv("BACKLOG_SPILL_DIR") or None
+# Follow the newest file of each system while SAP is still appending to it.
+# Off by default: the newest file is then read whole and marked completed.
+INGEST_TAIL_ENABLED = os.getenv("INGEST_TAIL_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_system_locks = {}
+_system_locks_guard = threading.Lock()
+
+
+class IngestionInProgress(Exception):
+    pass
+
+
+@contextmanager
+def system_lock(file_path_entry: filepathEntry):
+    # Only one ingestion per system at a time within this process, whether it
+    # comes from an HTTP call or the background scheduler.
+    key = (file_path_entry.sap_system_id, file_path_entry.app_server_instance)
+    with _system_locks_guard:
+        lock = _system_locks.setdefault(key, threading.Lock())
+    if not lock.acquire(blocking=False):
+        raise IngestionInProgress(f"Ingestion already running for {key[0]} / {key[1]}")
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def extract_timestamp(file_name: str):
+    try:
+        return datetime.strptime(file_name[:14], "%Y%m%d%H%M%S")
+    except ValueError:
+        return None
+
+
+def list_audit_files(folder_path: str):
+    files = [
+        (os.path.join(folder_path, f), extract_timestamp(f))
+        for f in os.listdir(folder_path)
+        if os.path.isfile(os.path.join(folder_path, f)) and extract_timestamp(f) is not None
+    ]
+    return sorted(files, key=lambda x: x[1])
+
+
+def get_last_processed_file(db: Session, file_path_entry: filepathEntry):
+    return (
+        db.query(lastfileEntry)
+        .filter(
+            lastfileEntry.sap_system_id == file_path_entry.sap_system_id,
+            lastfileEntry.app_server_instance == file_path_entry.app_server_instance
+        )
+        .first()
+    )
+
+
+def find_pending_files(db: Session, file_path_entry: filepathEntry):
+    # Returns [(file_path, byte_offset, record_count)] in timestamp order: an
+    # interrupted file is resumed from its watermark, newer files start at 0.
+    # The folder is always listed: a file the watcher never reported must not
+    # be passed over once a newer one has been checkpointed.
+    pending = []
+    last_processed_file = get_last_processed_file(db, file_path_entry)
+    if last_processed_file and not last_processed_file.completed:
+        file_path = os.path.join(file_path_entry.file_path, last_processed_file.file_name)
+        if os.path.isfile(file_path):
+            pending.append((file_path, last_processed_file.byte_offset, last_processed_file.record_count))
+
+    last_processed_time = extract_timestamp(last_processed_file.file_name) if last_processed_file else None
+    for file_path, file_time in list_audit_files(file_path_entry.file_path):
+        if last_processed_time is None or file_time > last_processed_time:
+            pending.append((file_path, 0, 0))
+    return pending
+
+
+def find_next_file(db: Session, file_path_entry: filepathEntry):
+    pending = find_pending_files(db, file_path_entry)
+    return pending[0] if pending else None
+
+
+def is_tail_file(pending, index):
+    # Only the newest file can still be open: once a newer file exists SAP
+    # has rolled over and the older one is read to its end.
+    return INGEST_TAIL_ENABLED and index == len(pending) - 1
+
+
+def save_checkpoint(db: Session, file_path_entry: filepathEntry, file_name: str, byte_offset: int,
+                    record_count: int, completed: bool):
+    existing_entry = get_last_processed_file(db, file_path_entry)
+    if existing_entry:
+        existing_entry.file_name = file_name
+        existing_entry.file_path = file_path_entry.file_path
+        existing_entry.date_processed = datetime.now()
+        existing_entry.byte_offset = byte_offset
+        existing_entry.record_count = record_count
+        existing_entry.completed = completed
+    else:
+        db.add(lastfileEntry(
+            sap_system_id=file_path_entry.sap_system_id,
+            app_server_instance=file_path_entry.app_server_instance,
+            file_name=file_name,
+            file_path=file_path_entry.file_path,
+            date_processed=datetime.now(),
+            byte_offset=byte_offset,
+            record_count=record_count,
+            completed=completed
+        ))
+
+    if completed:
+        db.add(FilecheckerEntry(
+            last_file_processed=file_name,
+            file_path=file_path_entry.file_path,
+            sap_system_id=file_path_entry.sap_system_id,
+            date=datetime.now(),
+        ))
+
+
+def _checkpointed_parser(db: Session, file_path_entry: filepathEntry, file_path: str, start_offset: int,
+                         record_count: int, tail: bool = False):
+    file_name = os.path.basename(file_path)
+
+    def checkpoint(byte_offset, total_records, completed):
+        save_checkpoint(db, file_path_entry, file_name, byte_offset, total_records, completed)
+
+    return LogParser(
+        file_path=file_path,
+        db_session=db,
+        sap_system_id=file_path_entry.sap_system_id,
+        app_server_instance=file_path_entry.app_server_instance,
+        delimiter=file_path_entry.delimiter,
+        start_offset=start_offset,
+        record_count=record_count,
+        checkpoint=checkpoint,
+        tail=tail
+    )
+
+
+def _file_result(parser: LogParser, success: bool, start_offset: int, record_count: int):
+    return {
+        "file_name": os.path.basename(parser.file_path),
+        "success": success,
+        "resumed": start_offset > 0,
+        "byte_offset": parser.byte_offset,
+        "record_count": parser.record_count,
+        "records_added": parser.records_inserted,
+        "duplicates_skipped": parser.duplicates,
+        "bytes_read": parser.end_offset - start_offset,
+        "tail": parser.tail,
+    }
+
+
+def publish_pending(file_path_entry: filepathEntry, pending, done: int):
+    # The open file followed in tail mode is not counted as waiting.
+    waiting = len(pending) - done
+    if waiting and is_tail_file(pending, len(pending) - 1):
+        waiting -= 1
+    set_files_pending(file_path_entry.sap_system_id, file_path_entry.app_server_instance, waiting)
+
+
+def ingest_file(db: Session, file_path_entry: filepathEntry, file_path: str, start_offset: int = 0,
+                record_count: int = 0, tail: bool = False):
+    started = time.perf_counter()
+    parser = _checkpointed_parser(db, file_path_entry, file_path, start_offset, record_count, tail)
+    success = parser.parse_and_store()
+    result = _file_result(parser, success, start_offset, record_count)
+
+    # Parsing and writing are interleaved; parse time is the remainder.
+    elapsed = time.perf_counter() - started
+    observe_parse(parser.sap_system_id, parser.app_server_instance, result["bytes_read"], parser.records_parsed,
+                  parser.skipped, parser.field_errors, max(elapsed - parser.insert_seconds, 0.0))
+    observe_file(parser.sap_system_id, parser.app_server_instance, success, result["records_added"], elapsed)
+    return result
+
+
+def ingest_next_file(db: Session, file_path_entry: filepathEntry):
+    with system_lock(file_path_entry):
+        pending = find_pending_files(db, file_path_entry)
+        if not pending:
+            publish_pending(file_path_entry, pending, 0)
+            return None
+        file_path, start_offset, record_count = pending[0]
+        result = ingest_file(db, file_path_entry, file_path, start_offset, record_count, is_tail_file(pending, 0))
+        publish_pending(file_path_entry, pending, 1 if result["success"] else 0)
+        return result
+
+
+def _parse_file_worker(file_path, delimiter, sap_system_id, app_server_instance, start_offset, tail):
+    started = time.perf_counter()
+    parser = LogParser(
+        file_path=file_path,
+        sap_system_id=sap_system_id,
+        app_server_instance=app_server_instance,
+        delimiter=delimiter,
+        start_offset=start_offset,
+        tail=tail
+    )
+    spill = tempfile.NamedTemporaryFile(dir=BACKLOG_SPILL_DIR, prefix="sm20_", suffix=".parsed", delete=False)
+    try:
+        with spill:
+            batch = []
+            for record in parser.iter_records():
+                batch.append(record)
+                if len(batch) >= BACKLOG_SPILL_BATCH_SIZE:
+                    pickle.dump(batch, spill, protocol=pickle.HIGHEST_PROTOCOL)
+                    batch = []
+            if batch:
+                pickle.dump(batch, spill, protocol=pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        os.remove(spill.name)
+        raise
+    stats = {
+        "records_parsed": parser.records_parsed,
+        "skipped": parser.skipped,
+        "field_errors": parser.field_errors,
+    }
+    return spill.name, parser.end_offset, time.perf_counter() - started, stats
+
+
+def _spilled_records(spill_path):
+    # Reads back one spilled batch at a time.
+    with open(spill_path, "rb") as spill:
+        while True:
+            try:
+                batch = pickle.load(spill)
+            except EOFError:
+                return
+            yield from batch
+
+
+def _discard_spill(future):
+    # Files parsed ahead of a failure are never written.
+    if future.done() and not future.cancelled() and future.exception() is None:
+        spill_path = future.result()[0]
+        if os.path.exists(spill_path):
+            os.remove(spill_path)
+
+
+def ingest_backlog(db: Session, file_path_entry: filepathEntry, max_workers: int = None):
+    with system_lock(file_path_entry):
+        return _ingest_backlog(db, file_path_entry, max_workers)
+
+
+def _ingest_backlog(db: Session, file_path_entry: filepathEntry, max_workers: int = None):
+    # Files are parsed ahead in worker processes but written and checkpointed
+    # strictly in timestamp order, stopping at the first failure, so
+    # last_file_processed only ever moves forward.
+    pending = find_pending_files(db, file_path_entry)
+    publish_pending(file_path_entry, pending, 0)
+    max_workers = max_workers or BACKLOG_MAX_WORKERS
+    results = []
+    started = time.perf_counter()
+
+    # Spawned, not forked: this runs inside the server process next to the
+    # scheduler threads and connection pools, whose locks a fork would copy.
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    window = deque()
+    try:
+        queued = iter(enumerate(pending))
+
+        def submit_next():
+            index, next_file = next(queued, (None, None))
+            if next_file:
+                file_path, start_offset, _ = next_file
+                tail = is_tail_file(pending, index)
+                window.append((next_file, tail, pool.submit(
+                    _parse_file_worker, file_path, file_path_entry.delimiter, file_path_entry.sap_system_id,
+                    file_path_entry.app_server_instance, start_offset, tail
+                )))
+
+        for _ in range(max_workers * 2):
+            submit_next()
+
+        while window:
+            (file_path, start_offset, record_count), tail, future = window.popleft()
+            submit_next()
+            parser = _checkpointed_parser(db, file_path_entry, file_path, start_offset, record_count, tail)
+            try:
+                spill_path, end_offset, parse_seconds, stats = future.result()
+            except Exception as e:
+                print(f"Error parsing {file_path}: {str(e)}")
+                results.append({**_file_result(parser, False, start_offset, record_count), "error": str(e)})
+                observe_file(parser.sap_system_id, parser.app_server_instance, False, 0, 0.0)
+                break
+            observe_parse(parser.sap_system_id, parser.app_server_instance, end_offset - start_offset,
+                          stats["records_parsed"], stats["skipped"], stats["field_errors"], parse_seconds)
+
+            write_started = time.perf_counter()
+            try:
+                success = parser.store_parsed_logs(_spilled_records(spill_path), end_offset)
+            finally:
+                os.remove(spill_path)
+            result = _file_result(parser, success, start_offset, record_count)
+            result["parse_seconds"] = round(parse_seconds, 3)
+            result["write_seconds"] = round(time.perf_counter() - write_started, 3)
+            results.append(result)
+            observe_file(parser.sap_system_id, parser.app_server_instance, success, result["records_added"],
+                         parse_seconds + result["write_seconds"])
+            publish_pending(file_path_entry, pending, sum(1 for result in results if result["success"]))
+            print(f"Backlog {len(results)}/{len(pending)}: {result['file_name']} "
+                  f"{result['records_added']} records, success={success}")
+            if not success:
+                break
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for _, _, future in window:
+            _discard_spill(future)
+
+    elapsed = time.perf_counter() - started
+    records_added = sum(result["records_added"] for result in results)
+    bytes_read = sum(result["bytes_read"] for result in results if result["success"])
+    return {
+        "pending_files": len(pending),
+        "files": results,
+        "processed": sum(1 for result in results if result["success"]),
+        "records_added": records_added,
+        "duplicates_skipped": sum(result["duplicates_skipped"] for result in results),
+        "elapsed_seconds": round(elapsed, 3),
+        "records_per_second": round(records_added / elapsed, 1) if elapsed else 0.0,
+        "mb_per_second": round(bytes_read / 1024 / 1024 / elapsed, 3) if elapsed else 0.0,
+        "workers": max_workers,
+    }
@@ -1,71 +1,185 @@
+import csv
+import io
+import mmap
+import os
 import re
+import time
+from collections import Counter
+from operator import itemgetter
+from psycopg2.errors import UniqueViolation
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from datetime import datetime
-from message_templates import MESSAGE_TEMPLATES
-from app.models.log import LogEntry
-
-VAR_PLACEHOLDERS = ['&A', '&B', '&C', '&D', '&E', '&F', '&G', '&H', '&I', '&J']
+from app.models.log import StoredLogEntry
+from app.services.dimension_service import dimension_cache
+from app.services.message_catalog import MESSAGE_CATALOG
+from app.services.metrics import observe_insert
+from app.services.partition_service import ensure_partitions_for
+from app.services.response_cache import data_generation
+from app.services.rollup_service import update_daily_rollup
+
+FILE_ENCODING = "utf-8"
+SAVE_BATCH_SIZE = 1000
+COPY_BATCH_SIZE = int(os.getenv("LOG_COPY_BATCH_SIZE", "10000"))
+LOG_COLUMNS = [column.name for column in StoredLogEntry.__table__.columns
+               if column.name not in ("id", "message_text_override")]
+COPY_NULL = "\\N"
+TAIL_BATCH_SIZE = int(os.getenv("LOG_TAIL_BATCH_SIZE", "500"))
+RECORD_HEADER_LENGTH = 35
+# Six variable fields followed by the event data, each with a 4-digit length.
+RECORD_FIELD_COUNT = 7
+# 4-digit record length followed by the 64-hex record hash.
+RECORD_TRAILER_LENGTH = 68
+RECORD_HASH = re.compile(r"[0-9A-Fa-f]{64}")
+# Rows already in log_entries are skipped on insert, so re-ingesting a file
+# adds nothing. The key is the record's position, not its hash: identical
+# events in the same second are distinct records with the same hash.
+DEDUP_KEY = ("instance_id", "source_file", "source_offset", "event_timestamp")
+RECORD_HASH_INDEX = LOG_COLUMNS.index("record_hash")
+# Enough of each inserted row to update the daily rollup and to tell where
+# the rows already stored for a file end.
+INSERTED_COLUMNS = ("event_timestamp", "message_type_id", "transaction_code", "source_offset")
+STAGING_TABLE = "log_entries_staging"
 
 
 class LogParser:
     def __init__(self, file_path, db_session=None, sap_system_id=None, app_server_instance=None, file_checker_id=None,
-                 delimiter=None):
+                 delimiter=None, catalog=None, bulk_copy=True, start_offset=0, record_count=0, checkpoint=None,
+                 tail=False):
         self.file_path = file_path
+        self.source_file = os.path.basename(file_path)
         self.db = db_session
         self.sap_system_id = sap_system_id
         self.app_server_instance = app_server_instance
         self.file_checker_id = file_checker_id
         self.delimiter = delimiter
+        self.catalog = catalog or MESSAGE_CATALOG
+        self.bulk_copy = bulk_copy
+        # Resumable position: byte offset of the first record not yet committed
+        # and the number of records committed before it.
+        self.start_offset = start_offset
+        self.byte_offset = start_offset
+        self.end_offset = start_offset
+        self.record_count = record_count
+        self.checkpoint = checkpoint
+        # Tail mode: the file is still being written, so a trailing partial
+        # record is left for the next pass and the file is never marked done.
+        self.tail = tail
+        # Plain counters in the hot loop; callers publish them once per pass.
+        self.records_parsed = 0
+        self.skipped = Counter()
+        self.field_errors = Counter()
+        self.insert_seconds = 0.0
+        self.records_inserted = 0
+        self.duplicates = 0
+        # Cleared while batches overlap rows an earlier ingest of this file
+        # stored; see _copy_batch.
+        self.copy_direct = True
+        # Dimension keys, looked up once the first batch is written.
+        self.instance_id = None
+        self.message_type_ids = None
+        self.message_types = None
 
     def parse_and_store(self):
+        # Parsing without storing is iter_records().
+        if not self.db:
+            raise ValueError("parse_and_store needs a db_session; use iter_records() to only parse")
         try:
-            parsed_segments = self._process_audit_file()
-            parsed_logs = self._parse_log_data(parsed_segments)
-
-            if self.db:
-                self._save_parsed_logs(parsed_logs)
-
+            self._save_parsed_logs(self.iter_records())
             return True
         except Exception as e:
             print(f"Error in parse_and_store: {str(e)}")
+            self.db.rollback()
             return False
 
-    def _process_audit_file(self):
-        print(f"Processing file: {self.file_path}")
-        print(f"Original delimiter: {self.delimiter}")
-
-        with open(self.file_path, "r") as f:
-            content = f.read()
-        print(f"Original file content length: {len(content)}")
-        # stripped_content = content[101:] if len(content) >= 101 else ""
-        print(f"Content length after stripping: {len(content)}")
-        message_classes = list(MESSAGE_TEMPLATES.keys())
-        if not message_classes:
-            raise ValueError("No message classes found in MESSAGE_TEMPLATES")
-        delimiter_escaped = re.escape(self.delimiter)
-        message_class_pattern = '|'.join(re.escape(cls) for cls in message_classes)
-        replacement_pattern = re.compile(f"({delimiter_escaped})({message_class_pattern})")
-        modified_content = replacement_pattern.sub(rf"\1TRNT\2", content)
-        print(f"Modified content length after replacement: {len(modified_content)}")
-
-        new_delimiter = self.delimiter + "TRNT"
-        print(f"New delimiter for splitting: {new_delimiter}")
-        delimiter_pattern = re.compile(re.escape(new_delimiter))
-        parsed_segments = delimiter_pattern.split(modified_content)
-
-        print(f"Number of valid parsed segments: {len(parsed_segments)}")
-
-        return parsed_segments
+    def store_parsed_logs(self, parsed_logs, end_offset):
+        # Writes records parsed elsewhere (e.g. in a worker process) through the
+        # same batched, checkpointed path as parse_and_store.
+        try:
+            self.end_offset = end_offset
+            self._save_parsed_logs(parsed_logs)
+            return True
+        except Exception as e:
+            print(f"Error in store_parsed_logs: {str(e)}")
+            self.db.rollback()
+            return False
 
-    def _parse_log_data(self, parsed_segments):
-        parsed_logs = []
+    def parse_records(self):
+        return list(self.iter_records())
 
-        for data in parsed_segments:
+    def iter_records(self):
+        return self._parse_log_data(self._process_audit_file())
+
+    def _process_audit_file(self):
+        # The file is memory-mapped and record boundaries are found in place, so
+        # only the segment currently being parsed is decoded into memory.
+        with open(self.file_path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            self.end_offset = max(file_size, self.start_offset)
+            if file_size <= self.start_offset:
+                return
+
+            delimiter_length = len(self.delimiter.encode(FILE_ENCODING))
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                segment_start = None
+                for boundary in self._iter_record_boundaries(content, self.start_offset):
+                    if segment_start is not None:
+                        yield (content[segment_start:boundary].decode(FILE_ENCODING, errors="replace"), segment_start,
+                               boundary)
+                    segment_start = boundary + delimiter_length
+                if segment_start is None:
+                    if self.tail:
+                        self.end_offset = self.start_offset
+                    return
+
+                last_segment = content[segment_start:].decode(FILE_ENCODING, errors="replace")
+                if not self.tail:
+                    yield last_segment, segment_start, file_size
+                else:
+                    # Stop exactly at the end of the last complete record; bytes
+                    # after it may be the start of the next delimiter.
+                    record_length = self._complete_record_length(last_segment)
+                    if record_length is None:
+                        self.end_offset = segment_start - delimiter_length
+                    else:
+                        record = last_segment[:record_length]
+                        self.end_offset = segment_start + len(record.encode(FILE_ENCODING))
+                        yield record, segment_start, self.end_offset
+
+    def _iter_record_boundaries(self, content, start_offset=0):
+        # A record starts wherever the delimiter is immediately followed by a
+        # known message ID; each candidate costs one set lookup regardless of
+        # how many classes the catalog holds.
+        delimiter = self.delimiter.encode(FILE_ENCODING)
+        id_offset = len(delimiter)
+        id_length = self.catalog.id_length
+        position = content.find(delimiter, start_offset)
+        while position != -1:
+            raw_id = content[position + id_offset:position + id_offset + id_length]
+            if self.catalog.is_boundary(raw_id):
+                yield position
+                position = content.find(delimiter, position + id_offset)
+            else:
+                position = content.find(delimiter, position + 1)
 
+    @staticmethod
+    def _complete_record_length(data):
+        index = RECORD_HEADER_LENGTH
+        for _ in range(RECORD_FIELD_COUNT):
+            length = data[index:index + 4]
+            if len(length) < 4 or not length.isdigit():
+                return None
+            index += 4 + int(length)
+        index += RECORD_TRAILER_LENGTH
+        return index if len(data) >= index else None
+
+    def _parse_log_data(self, parsed_segments):
+        for data, record_offset, end_offset in parsed_segments:
 
             message_id = data[:3]
-            if message_id not in MESSAGE_TEMPLATES:
-                print(f"Skipping segment with unknown message ID '{message_id}'")
+            if message_id not in self.catalog:
+                self.skipped["unknown_message_id"] += 1
                 continue
 
             log_entry = self._create_base_log_entry(data)
@@ -78,13 +192,15 @@ class LogParser:
 
             for field in var_fields:
                 log_entry[field], index = self._extract_field(data, index)
-            variables, _ = self._extract_event_data(data, index)
+            variables, index = self._extract_event_data(data, index)
+            log_entry["record_hash"] = self._extract_record_hash(data, index)
             self._add_variables_to_log(log_entry, variables)
-            self._apply_message_template(log_entry)
+            log_entry["source_file"] = self.source_file
+            log_entry["source_offset"] = record_offset
+            log_entry["end_offset"] = end_offset
+            self.records_parsed += 1
 
-            parsed_logs.append(log_entry)
-
-        return parsed_logs
+            yield log_entry
 
     def _create_base_log_entry(self, data):
         message_id = data[:3]
@@ -94,13 +210,10 @@ class LogParser:
         formatted_date, formatted_time = self._format_date_time(raw_date, raw_time)
 
         return {
-            "sap_system_id": self.sap_system_id,
-            "app_server_instance": self.app_server_instance,
             "message_identifier": message_id,
-            "syslog_msg_group": data[:2],
-            "sub_name": data[2:3],
             "date": formatted_date,
             "time": formatted_time,
+            "event_timestamp": self._parse_event_timestamp(raw_date, raw_time),
             "operating_system_number": data[19:24],
             "work_process_number": data[24:29],
             "sap_process": data[29:31],
@@ -116,55 +229,58 @@ class LogParser:
             "second_variable_value": "",
             "third_variable_value": "",
             "other_variable_values": "",
-            "audit_log_msg_text": "",
-            "audit_class": "",
-            "message_severity": "",
-            "criticality": "M",
-            "all_variables": []
+            "variable_count": 0,
+            "record_hash": None
         }
 
     def _extract_field(self, data, start_idx):
         try:
             field_length_str = data[start_idx:start_idx + 4]
             if not field_length_str.isdigit():
-                print(f"Invalid field length at position {start_idx}: '{field_length_str}'")
+                self.field_errors["invalid_field_length"] += 1
                 return "", start_idx + 4
 
             field_length = int(field_length_str)
 
             if start_idx + 4 + field_length > len(data):
-                print(f"Field length {field_length} exceeds available data at position {start_idx}")
+                self.field_errors["field_length_overflow"] += 1
                 return "", start_idx + 4
 
             field_value = data[start_idx + 4:start_idx + 4 + field_length]
             return field_value, start_idx + 4 + field_length
-        except Exception as e:
-            print(f"Error extracting field at {start_idx}: {e}")
+        except Exception:
+            self.field_errors["field_error"] += 1
             return "", start_idx + 4
 
     def _extract_event_data(self, data, start_idx):
         try:
             length_str = data[start_idx:start_idx + 4]
             if not length_str.isdigit():
-                print(f"Invalid event data length at position {start_idx}: '{length_str}'")
+                self.field_errors["invalid_event_length"] += 1
                 return [], start_idx + 4
 
             length = int(length_str)
             end_idx = start_idx + 4 + length
 
             if end_idx > len(data):
-                print(f"Event data length {length} exceeds available data at position {start_idx}")
+                self.field_errors["event_length_overflow"] += 1
                 return [], start_idx + 4
 
             event_data = data[start_idx + 4:end_idx]
             variables = event_data.split('&') if event_data else []
             return variables, end_idx
-        except Exception as e:
-            print(f"Error extracting event data at {start_idx}: {e}")
+        except Exception:
+            self.field_errors["event_data_error"] += 1
             return [], start_idx + 4
 
+    @staticmethod
+    def _extract_record_hash(data, index):
+        record_hash = data[index + 4:index + RECORD_TRAILER_LENGTH]
+        return record_hash.upper() if RECORD_HASH.fullmatch(record_hash) else None
+
     def _add_variables_to_log(self, log_entry, variables):
-        log_entry["all_variables"] = variables
+        # The message text is rendered from these when the entry is read.
+        log_entry["variable_count"] = len(variables)
 
         if variables:
             log_entry["first_variable_value"] = variables[0] if len(variables) > 0 else ""
@@ -172,32 +288,153 @@ class LogParser:
             log_entry["third_variable_value"] = variables[2] if len(variables) > 2 else ""
             log_entry["other_variable_values"] = "&".join(variables[3:]) if len(variables) > 3 else ""
 
-    def _apply_message_template(self, log_entry):
-        message_id = log_entry["message_identifier"]
-        template = MESSAGE_TEMPLATES.get(message_id)
-
-        if template:
-            message = template["message_text"]
-            for i, var in enumerate(log_entry["all_variables"]):
-                if i < len(VAR_PLACEHOLDERS):
-                    message = message.replace(VAR_PLACEHOLDERS[i], var)
-
-            log_entry.update({
-                "audit_log_msg_text": message,
-                "audit_class": template["audit_class"],
-                "message_severity": template["message_severity"],
-                "criticality": "H" if template["message_severity"] == "High"
-                else "M" if template["message_severity"] == "Medium"
-                else "L"
-            })
-
-    def _save_parsed_logs(self, parsed_logs):
+    def _save_parsed_logs(self, parsed_logs, batch_size=None):
+        if self.bulk_copy and self._supports_copy():
+            write_batch = self._copy_batch
+            batch_size = batch_size or (TAIL_BATCH_SIZE if self.tail else COPY_BATCH_SIZE)
+        else:
+            write_batch = self._insert_batch
+            batch_size = batch_size or SAVE_BATCH_SIZE
+
+        batch = []
         for entry in parsed_logs:
-            if "all_variables" in entry:
-                entry.pop("all_variables")
-            new_log = LogEntry(**entry)
-            self.db.add(new_log)
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                self._commit_batch(write_batch, batch)
+        self._commit_batch(write_batch, batch, final=True)
+
+    def _commit_batch(self, write_batch, batch, final=False):
+        # Rows, their rollup counts and the checkpoint that covers them are
+        # committed together, so a restart from self.byte_offset neither
+        # repeats nor skips a record.
+        rows_written = 0
+        duplicates = 0
+        newest_event = None
+        started = time.perf_counter()
+        if batch:
+            self._assign_keys(batch)
+            ensure_partitions_for(self.db, batch)
+            # Only rows that were actually inserted reach the rollup.
+            inserted = write_batch(batch)
+            update_daily_rollup(self.db, self._rollup_entries(inserted))
+            rows_written = len(inserted)
+            duplicates = len(batch) - rows_written
+            newest_event = max((row["event_timestamp"] for row in inserted if row["event_timestamp"]), default=None)
+            self.byte_offset = batch[-1]["end_offset"]
+            self.record_count += len(batch)
+            batch.clear()
+        if final:
+            self.byte_offset = self.end_offset
+        completed = final and not self.tail
+        if self.checkpoint:
+            self.checkpoint(self.byte_offset, self.record_count, completed)
         self.db.commit()
+        self.records_inserted += rows_written
+        self.duplicates += duplicates
+        if rows_written:
+            data_generation.bump()
+        if rows_written or duplicates:
+            seconds = time.perf_counter() - started
+            self.insert_seconds += seconds
+            observe_insert(self.sap_system_id, self.app_server_instance, rows_written, duplicates, seconds,
+                           newest_event)
+
+    def _assign_keys(self, batch):
+        if self.instance_id is None:
+            bind = self.db.get_bind()
+            self.instance_id = dimension_cache.instance_id(bind, self.sap_system_id, self.app_server_instance)
+            self.message_type_ids = dimension_cache.message_type_ids(bind, self.catalog)
+            self.message_types = {
+                self.message_type_ids[message_id]: template for message_id, template in self.catalog.templates.items()
+            }
+        message_type_ids = self.message_type_ids
+        for entry in batch:
+            entry["instance_id"] = self.instance_id
+            entry["message_type_id"] = message_type_ids[entry["message_identifier"]]
+
+    def _rollup_entries(self, inserted):
+        message_types = self.message_types
+        return [
+            {
+                "event_timestamp": row["event_timestamp"],
+                "sap_system_id": self.sap_system_id,
+                "transaction_code": row["transaction_code"],
+                "criticality": message_types[row["message_type_id"]]["criticality"],
+                "audit_class": message_types[row["message_type_id"]]["audit_class"],
+            }
+            for row in inserted
+        ]
+
+    def _supports_copy(self):
+        return self.db.get_bind().dialect.driver == "psycopg2"
+
+    def _copy_batch(self, batch):
+        # Rows are copied straight into log_entries under a savepoint. COPY
+        # cannot skip conflicts, so once a batch hits stored rows it is rolled
+        # back to the savepoint and batches are copied into a temporary
+        # staging table instead, then moved with INSERT ... ON CONFLICT DO
+        # NOTHING. All of it runs on the session's own connection, in the
+        # transaction that commits the checkpoint.
+        preparer = self.db.get_bind().dialect.identifier_preparer
+        columns = ", ".join(preparer.quote(name) for name in LOG_COLUMNS)
+        table = preparer.quote(StoredLogEntry.__tablename__)
+        cursor = self.db.connection().connection.cursor()
+        try:
+            if self.copy_direct:
+                cursor.execute("SAVEPOINT log_entries_copy")
+                try:
+                    self._copy_rows(cursor, table, columns, batch)
+                except UniqueViolation:
+                    cursor.execute("ROLLBACK TO SAVEPOINT log_entries_copy")
+                    self.copy_direct = False
+                else:
+                    cursor.execute("RELEASE SAVEPOINT log_entries_copy")
+                    return batch
+
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} AS SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            self._copy_rows(cursor, STAGING_TABLE, columns, batch)
+        finally:
+            cursor.close()
+        inserted = self.db.execute(text(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+            f"ON CONFLICT ({', '.join(DEDUP_KEY)}) DO NOTHING "
+            f"RETURNING {', '.join(preparer.quote(name) for name in INSERTED_COLUMNS)}"
+        )).mappings().all()
+        self.db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+        # Stored rows of a file end where an earlier ingest stopped, so once
+        # the last record of a batch is new, the following ones are too.
+        self.copy_direct = any(row["source_offset"] == batch[-1]["source_offset"] for row in inserted)
+        return inserted
+
+    @staticmethod
+    def _copy_rows(cursor, table, columns, batch):
+        # The record hash goes in as bytea hex input.
+        statement = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '{}')".format(table, columns, COPY_NULL)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        row_values = itemgetter(*LOG_COLUMNS)
+        for entry in batch:
+            values = list(row_values(entry))
+            record_hash = values[RECORD_HASH_INDEX]
+            values[RECORD_HASH_INDEX] = "\\x" + record_hash if record_hash else None
+            if None in values:
+                values = [COPY_NULL if value is None else value for value in values]
+            writer.writerow(values)
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+
+    def _insert_batch(self, batch):
+        statement = insert(StoredLogEntry).on_conflict_do_nothing(index_elements=list(DEDUP_KEY)).returning(
+            *[getattr(StoredLogEntry, name) for name in INSERTED_COLUMNS]
+        )
+        rows = []
+        for entry in batch:
+            row = {name: entry[name] for name in LOG_COLUMNS}
+            row["record_hash"] = bytes.fromhex(row["record_hash"]) if row["record_hash"] else None
+            rows.append(row)
+        return self.db.execute(statement, rows).mappings().all()
 
     @staticmethod
     def _format_date_time(raw_date, raw_time):
@@ -206,9 +443,17 @@ class LogParser:
         formatted_time = time_obj.strftime("%I:%M:%S %p")
         return formatted_date, formatted_time
 
+    @staticmethod
+    def _parse_event_timestamp(raw_date, raw_time):
+        try:
+            return datetime.strptime(raw_date + raw_time, "%Y%m%d%H%M%S")
+        except ValueError:
+            return None
+
 
 def parse_and_store_logs(file_path: str, db: Session, sap_system_id=None, app_server_instance=None,
-                         file_checker_id=None, delimiter=None):
+                         file_checker_id=None, delimiter=None, bulk_copy=True, start_offset=0, record_count=0,
+                         checkpoint=None, tail=False):
     try:
         parser = LogParser(
             file_path=file_path,
@@ -216,7 +461,12 @@ def parse_and_store_logs(file_path: str, db: Session, sap_system_id=None, app_se
             sap_system_id=sap_system_id,
             app_server_instance=app_server_instance,
             file_checker_id=file_checker_id,
-            delimiter=delimiter
+            delimiter=delimiter,
+            bulk_copy=bulk_copy,
+            start_offset=start_offset,
+            record_count=record_count,
+            checkpoint=checkpoint,
+            tail=tail
         )
         return parser.parse_and_store()
     except Exception as e:
@@ -0,0 +1,38 @@
+from message_templates import MESSAGE_TEMPLATES, MESSAGE_ID_LENGTH
+
+SEVERITY_CRITICALITY = {"High": "H", "Medium": "M"}
+DEFAULT_CRITICALITY = "L"
+
+
+class MessageCatalog:
+    def __init__(self, templates, encoding="utf-8"):
+        if not templates:
+            raise ValueError("No message classes found in MESSAGE_TEMPLATES")
+
+        self.templates = {}
+        for message_id, template in templates.items():
+            self.templates[message_id] = {
+                "message_text": template["message_text"],
+                "audit_class": template["audit_class"],
+                "message_severity": template["message_severity"],
+                "criticality": SEVERITY_CRITICALITY.get(template["message_severity"], DEFAULT_CRITICALITY),
+            }
+        # Raw message IDs as they appear in the file, so record boundaries can be
+        # confirmed with a single set lookup instead of a regex alternation.
+        self.raw_ids = frozenset(message_id.encode(encoding) for message_id in self.templates)
+        self.id_length = MESSAGE_ID_LENGTH
+
+    def __contains__(self, message_id):
+        return message_id in self.templates
+
+    def __len__(self):
+        return len(self.templates)
+
+    def get(self, message_id):
+        return self.templates.get(message_id)
+
+    def is_boundary(self, raw_id):
+        return raw_id in self.raw_ids
+
+
+MESSAGE_CATALOG = MessageCatalog(MESSAGE_TEMPLATES)
@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+SYSTEM_LABELS = ("sap_system_id", "app_server_instance")
+
+BYTES_READ = Counter("sm20_ingest_bytes_read", "Bytes of audit files parsed", SYSTEM_LABELS)
+RECORDS_PARSED = Counter("sm20_ingest_records_parsed", "Records parsed from audit files", SYSTEM_LABELS)
+RECORDS_SKIPPED = Counter("sm20_ingest_records_skipped", "Records dropped while parsing",
+                          SYSTEM_LABELS + ("reason",))
+FIELD_ERRORS = Counter("sm20_ingest_field_errors", "Malformed fields stored as empty values",
+                       SYSTEM_LABELS + ("reason",))
+RECORDS_WRITTEN = Counter("sm20_ingest_records_written", "Records committed to log_entries", SYSTEM_LABELS)
+RECORDS_DUPLICATE = Counter("sm20_ingest_records_duplicate", "Records already in log_entries, skipped on insert",
+                            SYSTEM_LABELS)
+FILES_PROCESSED = Counter("sm20_ingest_files", "Audit file passes by outcome", SYSTEM_LABELS + ("status",))
+PARSE_SECONDS = Histogram("sm20_ingest_parse_seconds", "Parse time per file pass", SYSTEM_LABELS,
+                          buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+INSERT_SECONDS = Histogram("sm20_ingest_insert_seconds", "Write time per committed batch", SYSTEM_LABELS,
+                           buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+ROWS_PER_SECOND = Gauge("sm20_ingest_rows_per_second", "Records per second of the last file pass", SYSTEM_LABELS)
+FILES_PENDING = Gauge("sm20_ingest_files_pending", "Audit files waiting to be ingested", SYSTEM_LABELS)
+
+REQUEST_LABELS = ("method", "route")
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+REQUEST_SECONDS = Histogram("sm20_http_request_seconds", "Request latency per route", REQUEST_LABELS,
+                            buckets=REQUEST_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("sm20_http_request_db_seconds", "Database time per request", REQUEST_LABELS,
+                               buckets=REQUEST_BUCKETS)
+REQUEST_SERIALIZE_SECONDS = Histogram("sm20_http_request_serialize_seconds",
+                                      "Response validation and encoding time per request", REQUEST_LABELS,
+                                      buckets=REQUEST_BUCKETS)
+
+
+class IngestLagCollector:
+    # Lag is computed at scrape time, so it keeps growing while nothing new
+    # is ingested instead of freezing at the last observed value.
+    def __init__(self):
+        self._newest = {}
+        self._lock = threading.Lock()
+
+    def observe(self, sap_system_id, app_server_instance, event_timestamp):
+        key = (sap_system_id or "", app_server_instance or "")
+        with self._lock:
+            if event_timestamp and (key not in self._newest or event_timestamp > self._newest[key]):
+                self._newest[key] = event_timestamp
+
+    def collect(self):
+        lag = GaugeMetricFamily("sm20_ingest_lag_seconds", "Now minus the newest ingested event timestamp",
+                                labels=SYSTEM_LABELS)
+        now = datetime.now()
+        with self._lock:
+            for key, newest in self._newest.items():
+                lag.add_metric(key, (now - newest).total_seconds())
+        yield lag
+
+
+INGEST_LAG = IngestLagCollector()
+REGISTRY.register(INGEST_LAG)
+
+
+def _labels(sap_system_id, app_server_instance):
+    return sap_system_id or "", app_server_instance or ""
+
+
+def observe_parse(sap_system_id, app_server_instance, bytes_read, records_parsed, skipped, field_errors, seconds):
+    labels = _labels(sap_system_id, app_server_instance)
+    BYTES_READ.labels(*labels).inc(bytes_read)
+    RECORDS_PARSED.labels(*labels).inc(records_parsed)
+    for reason, count in skipped.items():
+        RECORDS_SKIPPED.labels(*labels, reason).inc(count)
+    for reason, count in field_errors.items():
+        FIELD_ERRORS.labels(*labels, reason).inc(count)
+    PARSE_SECONDS.labels(*labels).observe(seconds)
+
+
+def observe_insert(sap_system_id, app_server_instance, rows, duplicates, seconds, newest_event):
+    labels = _labels(sap_system_id, app_server_instance)
+    RECORDS_WRITTEN.labels(*labels).inc(rows)
+    RECORDS_DUPLICATE.labels(*labels).inc(duplicates)
+    INSERT_SECONDS.labels(*labels).observe(seconds)
+    INGEST_LAG.observe(*labels, newest_event)
+
+
+def observe_file(sap_system_id, app_server_instance, success, records, seconds):
+    labels = _labels(sap_system_id, app_server_instance)
+    FILES_PROCESSED.labels(*labels, "success" if success else "failed").inc()
+    if success and seconds > 0:
+        ROWS_PER_SECOND.labels(*labels).set(records / seconds)
+
+
+def set_files_pending(sap_system_id, app_server_instance, count):
+    FILES_PENDING.labels(*_labels(sap_system_id, app_server_instance)).set(count)
+
+
+def observe_request(method, route, seconds, db_seconds, serialize_seconds):
+    # Unmatched paths share one label so scans cannot blow up the series count.
+    labels = method, route or "unmatched"
+    REQUEST_SECONDS.labels(*labels).observe(seconds)
+    REQUEST_DB_SECONDS.labels(*labels).observe(db_seconds)
+    REQUEST_SERIALIZE_SECONDS.labels(*labels).observe(serialize_seconds)
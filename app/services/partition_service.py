@@ -0,0 +1,256 @@
+import argparse
+import os
+import re
+import threading
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, text
+
+from app.models.database import engine
+from app.models.log import StoredLogEntry
+from app.models.log_daily_rollup import LogDailyRollup
+from app.services.response_cache import data_generation
+
+LOG_PARTITION_INTERVAL = os.getenv("LOG_PARTITION_INTERVAL", "month").lower()
+# Partitions created ahead of the current one, so live ingestion rarely has to
+# attach a partition itself.
+LOG_PARTITION_PRECREATE = int(os.getenv("LOG_PARTITION_PRECREATE", "2"))
+# 0 keeps everything; otherwise partitions that end more than this many days
+# ago are dropped or detached by the maintenance job.
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+LOG_RETENTION_MODE = os.getenv("LOG_RETENTION_MODE", "detach").lower()
+# 0 disables archiving; otherwise partitions that end more than this many days
+# ago are moved out of log_entries into Parquet files (see archive_service).
+LOG_ARCHIVE_AFTER_DAYS = int(os.getenv("LOG_ARCHIVE_AFTER_DAYS", "0"))
+
+PARENT_TABLE = StoredLogEntry.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+UNPARTITIONED_TABLE = f"{PARENT_TABLE}_unpartitioned"
+PARTITION_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+LIST_PARTITIONS = text("""
+    SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+    FROM pg_inherits
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = to_regclass(:parent)
+""")
+# Serializes partition creation across processes; held until commit.
+PARTITION_LOCK = text("SELECT pg_advisory_xact_lock(hashtext(:parent))")
+
+
+def partition_start(value, interval=LOG_PARTITION_INTERVAL):
+    day = value.date() if isinstance(value, datetime) else value
+    return day if interval == "day" else day.replace(day=1)
+
+
+def next_partition_start(start, interval=LOG_PARTITION_INTERVAL):
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(start, interval=LOG_PARTITION_INTERVAL):
+    if interval == "day" or start.day != 1:
+        return f"{PARENT_TABLE}_p{start:%Y_%m_%d}"
+    return f"{PARENT_TABLE}_p{start:%Y_%m}"
+
+
+def is_partitioned(connection):
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:parent)"), {"parent": PARENT_TABLE}
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(connection):
+    # (name, start, end) of every range partition, oldest first; the default
+    # partition only holds rows without an event_timestamp.
+    partitions = []
+    for name, bound in connection.execute(LIST_PARTITIONS, {"parent": PARENT_TABLE}):
+        match = PARTITION_BOUND.search(bound or "")
+        if match:
+            start, end = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append((name, start, end))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+class PartitionCache:
+    # Ranges already attached, so the ingest path only queries the catalog when
+    # a batch has an event date no known partition covers.
+    def __init__(self):
+        self._ranges = None
+        self._lock = threading.Lock()
+
+    def missing(self, days):
+        with self._lock:
+            if self._ranges is None:
+                return set(days)
+            return {
+                day for day in days
+                if not any(start <= datetime.combine(day, time.min) < end for start, end in self._ranges)
+            }
+
+    def load(self, connection):
+        partitions = list_partitions(connection)
+        with self._lock:
+            self._ranges = [(start, end) for _, start, end in partitions]
+        return partitions
+
+    def reset(self):
+        with self._lock:
+            self._ranges = None
+
+
+partition_cache = PartitionCache()
+
+
+def _free_range(partitions, day, interval):
+    # The configured interval clipped to the gap around day, so changing
+    # LOG_PARTITION_INTERVAL never produces overlapping partitions.
+    start = datetime.combine(partition_start(day, interval), time.min)
+    end = datetime.combine(next_partition_start(start.date(), interval), time.min)
+    for _, other_start, other_end in partitions:
+        if start < other_end <= datetime.combine(day, time.min):
+            start = other_end
+        if datetime.combine(day, time.min) < other_start < end:
+            end = other_start
+    return start, end
+
+
+def ensure_partitions(connection, days, interval=LOG_PARTITION_INTERVAL):
+    # Runs on the caller's connection, inside its transaction: ATTACH PARTITION
+    # only takes a SHARE UPDATE EXCLUSIVE lock on log_entries, so concurrent
+    # reads and other ingests keep going while a partition is added.
+    missing = partition_cache.missing(set(days))
+    if not missing:
+        return []
+    connection.execute(PARTITION_LOCK, {"parent": PARENT_TABLE})
+    # Only the catalog as read here is cached; partitions attached below are
+    # trusted once a later call reads them back after this transaction commits.
+    partitions = partition_cache.load(connection)
+    created = []
+    for day in sorted(missing):
+        moment = datetime.combine(day, time.min)
+        if any(start <= moment < end for _, start, end in partitions):
+            continue
+        start, end = _free_range(partitions, day, interval)
+        name = partition_name(start.date(), interval)
+        connection.execute(text(
+            f'CREATE TABLE "{name}" (LIKE "{PARENT_TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        ))
+        connection.execute(text(
+            f'ALTER TABLE "{PARENT_TABLE}" ATTACH PARTITION "{name}" '
+            f"FOR VALUES FROM ('{start.isoformat(' ')}') TO ('{end.isoformat(' ')}')"
+        ))
+        partitions.append((name, start, end))
+        created.append(name)
+    return created
+
+
+def ensure_partitions_for(db, entries):
+    days = {entry["event_timestamp"].date() for entry in entries if entry["event_timestamp"] is not None}
+    return ensure_partitions(db.connection(), days)
+
+
+def create_upcoming_partitions(bind=engine, count=LOG_PARTITION_PRECREATE, interval=LOG_PARTITION_INTERVAL):
+    start = partition_start(date.today(), interval)
+    days = [start]
+    for _ in range(count):
+        start = next_partition_start(start, interval)
+        days.append(start)
+    with bind.begin() as connection:
+        return ensure_partitions(connection, days, interval)
+
+
+def partition_log_entries(bind=engine, interval=LOG_PARTITION_INTERVAL):
+    # One-time conversion of a log_entries heap table created before
+    # partitioning: rows are copied into a partitioned table of the same name
+    # and ids keep coming from the same sequence.
+    with bind.begin() as connection:
+        if connection.execute(text("SELECT to_regclass(:parent) IS NULL"), {"parent": PARENT_TABLE}).scalar():
+            return 0
+        if is_partitioned(connection):
+            connection.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{PARENT_TABLE}" DEFAULT'
+            ))
+            return 0
+
+        print(f"Partitioning {PARENT_TABLE} by {interval}")
+        connection.execute(text(f'LOCK TABLE "{PARENT_TABLE}" IN ACCESS EXCLUSIVE MODE'))
+        connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" RENAME TO "{UNPARTITIONED_TABLE}"'))
+        connection.execute(text(f'ALTER SEQUENCE IF EXISTS "{PARENT_TABLE}_id_seq" OWNED BY NONE'))
+        # Free the index names for the partitioned table.
+        for (constraint,) in connection.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'p'"
+        ), {"table": UNPARTITIONED_TABLE}).all():
+            connection.execute(text(f'ALTER TABLE "{UNPARTITIONED_TABLE}" DROP CONSTRAINT "{constraint}"'))
+        for (index,) in connection.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+        ), {"table": UNPARTITIONED_TABLE}).all():
+            connection.execute(text(f'DROP INDEX "{index}"'))
+
+        StoredLogEntry.__table__.create(connection, checkfirst=True)
+        connection.execute(text(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{PARENT_TABLE}" DEFAULT'))
+        partition_cache.reset()
+        days = connection.execute(text(
+            f'SELECT DISTINCT event_timestamp::date FROM "{UNPARTITIONED_TABLE}" WHERE event_timestamp IS NOT NULL'
+        )).scalars().all()
+        ensure_partitions(connection, days, interval)
+
+        columns = ", ".join(f'"{column.name}"' for column in StoredLogEntry.__table__.columns)
+        rows = connection.execute(text(
+            f'INSERT INTO "{PARENT_TABLE}" ({columns}) SELECT {columns} FROM "{UNPARTITIONED_TABLE}"'
+        )).rowcount
+        connection.execute(text(f'DROP TABLE "{UNPARTITIONED_TABLE}"'))
+    print(f"Partitioned {PARENT_TABLE}: {rows} rows")
+    return rows
+
+
+def apply_retention(bind=engine, retention_days=LOG_RETENTION_DAYS, mode=LOG_RETENTION_MODE, today=None):
+    # Whole partitions only: a partition is removed once its end is older than
+    # the cutoff, which replaces a bloating DELETE with a catalog change.
+    if retention_days <= 0:
+        return []
+    cutoff = datetime.combine((today or date.today()) - timedelta(days=retention_days), time.min)
+    removed = []
+    with bind.begin() as connection:
+        for name, start, end in list_partitions(connection):
+            if end > cutoff:
+                continue
+            if mode == "drop":
+                connection.execute(text(f'DROP TABLE "{name}"'))
+            else:
+                connection.execute(text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"'))
+            # The dashboard rollup only describes rows still in log_entries.
+            connection.execute(delete(LogDailyRollup).where(
+                LogDailyRollup.event_date >= start.date(), LogDailyRollup.event_date < end.date()
+            ))
+            removed.append(name)
+    if removed:
+        partition_cache.reset()
+        data_generation.bump()
+        print(f"Retention ({mode}, {retention_days} days): {', '.join(removed)}")
+    return removed
+
+
+def run_partition_maintenance(bind=engine):
+    created = create_upcoming_partitions(bind)
+    removed = apply_retention(bind)
+    return {"created": created, "removed": removed}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("command", choices=("list", "maintain", "retention"))
+    arg_parser.add_argument("--retention-days", type=int, default=LOG_RETENTION_DAYS)
+    arg_parser.add_argument("--mode", choices=("drop", "detach"), default=LOG_RETENTION_MODE)
+    args = arg_parser.parse_args()
+
+    if args.command == "list":
+        with engine.connect() as connection:
+            for name, start, end in list_partitions(connection):
+                print(f"{name}: {start} .. {end}")
+    elif args.command == "maintain":
+        print(run_partition_maintenance())
+    else:
+        print(apply_retention(retention_days=args.retention_days, mode=args.mode))
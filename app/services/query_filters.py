@@ -0,0 +1,149 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime, time, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+
+from app.models.log import SEARCH_COLUMNS, LogEntry, StoredLogEntry
+from app.models.log_archive import LogArchive
+from app.models.log_daily_rollup import LogDailyRollup
+from app.models.message_type import MessageType
+
+# Shorter terms have no complete trigram, so the index could not narrow them.
+SEARCH_MIN_LENGTH = 3
+# Not a backslash, which the dialect used by estimate_count() would double.
+SEARCH_ESCAPE = "/"
+
+
+def date_range_bounds(start_date: date = None, end_date: date = None):
+    # Half-open [start 00:00, day after end 00:00) so the whole end day is
+    # included and the bounds compare directly against event_timestamp.
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="Start date must be before end date")
+    start = datetime.combine(start_date, time.min) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+    return start, end
+
+
+def apply_date_range(query, start_date: date = None, end_date: date = None):
+    start, end = date_range_bounds(start_date, end_date)
+    if start:
+        query = query.filter(LogEntry.event_timestamp >= start)
+    if end:
+        query = query.filter(LogEntry.event_timestamp < end)
+    return query
+
+
+def apply_rollup_date_range(query, start_date: date = None, end_date: date = None):
+    date_range_bounds(start_date, end_date)
+    if start_date:
+        query = query.filter(LogDailyRollup.event_date >= start_date)
+    if end_date:
+        query = query.filter(LogDailyRollup.event_date <= end_date)
+    return query
+
+
+def archived_paths_query(start_date: date = None, end_date: date = None):
+    # Archive files overlapping the range. Callers only import archive_service,
+    # and with it DuckDB and pyarrow, when this finds any.
+    start, end = date_range_bounds(start_date, end_date)
+    query = select(LogArchive.path)
+    if start:
+        query = query.where(LogArchive.range_end > start)
+    if end:
+        query = query.where(LogArchive.range_start < end)
+    return query.order_by(LogArchive.range_start)
+
+
+async def archived_paths(db, start_date: date = None, end_date: date = None):
+    return (await db.execute(archived_paths_query(start_date, end_date))).scalars().all()
+
+
+def apply_log_filters(query, start_date: date = None, end_date: date = None, t_code=None, program=None,
+                      criticality=None, user=None, sap_system_id=None):
+    query = apply_date_range(query, start_date, end_date)
+    if t_code is not None:
+        query = query.filter(LogEntry.transaction_code == t_code)
+    if program is not None:
+        query = query.filter(LogEntry.program == program)
+    if criticality is not None:
+        query = query.filter(LogEntry.criticality == criticality)
+    if user is not None:
+        query = query.filter(LogEntry.user == user)
+    if sap_system_id is not None:
+        query = query.filter(LogEntry.sap_system_id == sap_system_id)
+    return query
+
+
+def search_pattern(term: str):
+    # Substring pattern for ILIKE, with the term's own wildcards taken literally.
+    for special in (SEARCH_ESCAPE, "%", "_"):
+        term = term.replace(special, SEARCH_ESCAPE + special)
+    return f"%{term}%"
+
+
+def matching_message_types(pattern):
+    return select(MessageType.id).where(MessageType.message_text.ilike(pattern, escape=SEARCH_ESCAPE))
+
+
+def apply_search(query, pattern, message_type_ids=()):
+    # Message text is not stored per row, so it is matched on the template
+    # through message_type_id; a match spanning template and variable text is
+    # not found. The remaining columns are covered by the trigram index.
+    conditions = [getattr(LogEntry, column).ilike(pattern, escape=SEARCH_ESCAPE) for column in SEARCH_COLUMNS]
+    conditions.append(StoredLogEntry.__table__.c.message_text_override.ilike(pattern, escape=SEARCH_ESCAPE))
+    if message_type_ids:
+        conditions.append(StoredLogEntry.__table__.c.message_type_id.in_(message_type_ids))
+    return query.filter(or_(*conditions))
+
+
+def newest_first(query):
+    return query.order_by(LogEntry.event_timestamp.desc(), LogEntry.id.desc())
+
+
+def encode_cursor(log_entry):
+    timestamp = log_entry.event_timestamp.isoformat() if log_entry.event_timestamp else None
+    payload = json.dumps([timestamp, log_entry.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, entry_id = json.loads(payload)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(entry_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_cursor(query, cursor: str = None):
+    # Keyset condition for newest_first(): rows strictly after the cursor's
+    # (event_timestamp, id). PostgreSQL sorts NULL timestamps first in DESC.
+    if not cursor:
+        return query
+    timestamp, entry_id = decode_cursor(cursor)
+    if timestamp is None:
+        return query.filter(or_(
+            and_(LogEntry.event_timestamp.is_(None), LogEntry.id < entry_id),
+            LogEntry.event_timestamp.isnot(None)
+        ))
+    return query.filter(tuple_(LogEntry.event_timestamp, LogEntry.id) < tuple_(timestamp, entry_id))
+
+
+async def count_rows(db, statement):
+    return await db.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+
+
+async def estimate_count(db, statement):
+    # Planner row estimate for the filtered query; no rows are read.
+    if db.bind.dialect.name != "postgresql":
+        return await count_rows(db, statement)
+    compiled = statement.order_by(None).compile(dialect=postgresql.dialect(paramstyle="named"),
+                                                 compile_kwargs={"render_postcompile": True})
+    plan = await db.scalar(text("EXPLAIN (FORMAT JSON) " + str(compiled)), compiled.params)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,234 @@
+import asyncio
+import cProfile
+import functools
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.services.metrics import observe_request
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "sm20_profiles"))
+
+_current_timing = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    def __init__(self, method):
+        self.method = method
+        self.route = None
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.endpoint_seconds = 0.0
+        self.route_seconds = 0.0
+        self.profile = None
+        # Sync endpoints and their queries run in the threadpool.
+        self._lock = threading.Lock()
+
+    def add_db(self, seconds):
+        with self._lock:
+            self.db_seconds += seconds
+            self.db_queries += 1
+
+    @property
+    def serialize_seconds(self):
+        # Route handler time outside the endpoint: request parsing, response
+        # model validation and JSON encoding.
+        return max(self.route_seconds - self.endpoint_seconds, 0.0)
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        metrics = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"']
+        if self.route:
+            metrics.append(f"app;dur={max(self.endpoint_seconds - self.db_seconds, 0.0) * 1000:.1f}")
+            metrics.append(f"serialize;dur={self.serialize_seconds * 1000:.1f}")
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, not the connection: after_cursor_execute
+    # does not fire for a statement that raises.
+    context.query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add_db(time.perf_counter() - context.query_started)
+
+
+def install_db_timing(*engines):
+    # Async engines are hooked through their sync_engine.
+    for engine in engines:
+        engine = getattr(engine, "sync_engine", engine)
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingSwitch:
+    # Admin-controlled sampling of one route. Only one request is profiled at
+    # a time; cProfile cannot run two profilers at once.
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.route = None
+        self.sample_rate = 0.0
+        self.max_profiles = 0
+        self.profiles = []
+        self._busy = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.route is not None and len(self.profiles) < self.max_profiles
+
+    def configure(self, route, sample_rate, max_profiles):
+        self.route = route
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self.profiles = []
+
+    def disable(self):
+        self.route = None
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "route": self.route,
+            "sample_rate": self.sample_rate,
+            "max_profiles": self.max_profiles,
+            "directory": self.directory,
+            "profiles": self.profiles,
+        }
+
+    def start(self, route):
+        if route != self.route or not self.enabled or random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            return None
+        return cProfile.Profile()
+
+    def finish(self, profile, route):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            path = os.path.join(self.directory, f"{name}_{datetime.now():%Y%m%d_%H%M%S_%f}.pstats")
+            profile.dump_stats(path)
+            self.profiles.append(path)
+        finally:
+            self._busy.release()
+
+
+profiling = ProfilingSwitch()
+
+
+def _record_endpoint_time(started):
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.endpoint_seconds += time.perf_counter() - started
+
+
+def _timed_endpoint(endpoint):
+    # include_router() builds new routes from already wrapped endpoints.
+    if getattr(endpoint, "timed", False):
+        return endpoint
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _record_endpoint_time(started)
+
+        timed.timed = True
+        return timed
+
+    @functools.wraps(endpoint)
+    def timed(*args, **kwargs):
+        # Sync endpoints run in the threadpool, so they are profiled here, in
+        # the thread that does the work.
+        timing = _current_timing.get()
+        profile = timing.profile if timing is not None else None
+        started = time.perf_counter()
+        if profile:
+            profile.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if profile:
+                profile.disable()
+            _record_endpoint_time(started)
+
+    timed.timed = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        self.async_endpoint = asyncio.iscoroutinefunction(endpoint)
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path
+        async_endpoint = self.async_endpoint
+
+        async def timed_handler(request):
+            timing = _current_timing.get()
+            if timing is None:
+                return await handler(request)
+            timing.route = route
+            timing.profile = profiling.start(route)
+            profile_here = timing.profile is not None and async_endpoint
+            started = time.perf_counter()
+            if profile_here:
+                timing.profile.enable()
+            try:
+                return await handler(request)
+            finally:
+                if profile_here:
+                    timing.profile.disable()
+                timing.route_seconds += time.perf_counter() - started
+                if timing.profile is not None:
+                    profiling.finish(timing.profile, route)
+                    timing.profile = None
+
+        return timed_handler
+
+
+class RequestTimingMiddleware:
+    # Adds a Server-Timing header (db, app, serialize, total) to every response
+    # and records per-route latency. Streaming responses send the header before
+    # the body, so their query time only reaches the metrics.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope["method"])
+        token = _current_timing.set(timing)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timing.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            observe_request(timing.method, timing.route, time.perf_counter() - timing.started, timing.db_seconds,
+                            timing.serialize_seconds)
@@ -0,0 +1,95 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "256"))
+DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "300"))
+
+
+class DataGeneration:
+    # Bumped on every ingest commit that adds rows; cached responses from an
+    # older generation are stale.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+            return self.value
+
+
+class ResponseCache:
+    def __init__(self, generation, max_size=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL):
+        self.generation = generation
+        self.max_size = max_size
+        # The TTL only matters for changes this process does not see, such as
+        # another worker ingesting into the same database.
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == self.generation.value and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, generation):
+        with self._lock:
+            self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "generation": self.generation.value,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def cached(self, endpoint):
+        # Keyed on the endpoint and its query parameters; the db session is
+        # not part of the key.
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs):
+            key = (endpoint, tuple(sorted((name, value) for name, value in kwargs.items() if name != "db")))
+            # Read before running the query, so rows committed while it runs
+            # leave the entry already stale.
+            generation = self.generation.value
+            hit, value = self.get(key)
+            if hit:
+                return value
+            value = await endpoint(**kwargs)
+            self.put(key, value, generation)
+            return value
+
+        return wrapper
+
+
+data_generation = DataGeneration()
+dashboard_cache = ResponseCache(data_generation)
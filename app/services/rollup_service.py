@@ -0,0 +1,98 @@
+from collections import Counter
+
+from sqlalchemy import BigInteger, cast, func, text
+
+from app.models.database import engine
+from app.models.log_daily_rollup import LogDailyRollup
+from app.services.response_cache import data_generation
+
+ROLLUP_DIMENSIONS = ("sap_system_id", "transaction_code", "criticality", "audit_class")
+ROLLUP_KEY = ("event_date",) + ROLLUP_DIMENSIONS
+
+REBUILD_DAILY_ROLLUP = text("""
+    INSERT INTO log_daily_rollup (event_date, sap_system_id, transaction_code, criticality, audit_class, log_count)
+    SELECT entry.event_timestamp::date,
+           instance.sap_system_id,
+           coalesce(entry.transaction_code, ''),
+           coalesce(message_type.criticality, ''),
+           coalesce(message_type.audit_class, ''),
+           count(*)
+    FROM log_entries AS entry
+    JOIN sap_instances AS instance ON instance.id = entry.instance_id
+    JOIN message_types AS message_type ON message_type.id = entry.message_type_id
+    WHERE entry.event_timestamp IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5
+""")
+
+# One statement per batch, with the counts passed as arrays; it runs once per
+# ingested file, so it is kept cheap to send and plan.
+ADD_ROLLUP_COUNTS = text("""
+    INSERT INTO log_daily_rollup (event_date, sap_system_id, transaction_code, criticality, audit_class, log_count)
+    SELECT * FROM unnest(CAST(:event_date AS date[]), CAST(:sap_system_id AS varchar[]),
+                         CAST(:transaction_code AS varchar[]), CAST(:criticality AS varchar[]),
+                         CAST(:audit_class AS varchar[]), CAST(:log_count AS bigint[]))
+    ON CONFLICT (event_date, sap_system_id, transaction_code, criticality, audit_class)
+    DO UPDATE SET log_count = log_daily_rollup.log_count + excluded.log_count
+""")
+
+
+def rollup_counts(entries):
+    # Entries without a parsable timestamp never match a date range, so they
+    # are left out of the rollup.
+    counts = Counter()
+    for entry in entries:
+        if entry["event_timestamp"] is not None:
+            counts[(entry["event_timestamp"].date(),) + tuple(entry[name] or "" for name in ROLLUP_DIMENSIONS)] += 1
+    return counts
+
+
+def update_daily_rollup(db, entries):
+    add_rollup_counts(db, rollup_counts(entries))
+
+
+def add_rollup_counts(db, counts):
+    if not counts:
+        return
+    # Keys are upserted in a fixed order so concurrent ingests of systems that
+    # share rollup rows cannot deadlock.
+    columns = zip(*(key + (count,) for key, count in sorted(counts.items())))
+    db.execute(ADD_ROLLUP_COUNTS, dict(zip(ROLLUP_KEY + ("log_count",), map(list, columns))))
+
+
+def rebuild_daily_rollup(bind=engine):
+    # Imported here so the ingest path, which only needs update_daily_rollup,
+    # does not load DuckDB and pyarrow.
+    from app.services.query_filters import archived_paths_query
+
+    LogDailyRollup.__table__.create(bind, checkfirst=True)
+    with bind.begin() as connection:
+        connection.execute(text("LOCK TABLE log_entries IN SHARE MODE"))
+        connection.execute(text("DELETE FROM log_daily_rollup"))
+        rows = connection.execute(REBUILD_DAILY_ROLLUP).rowcount
+        # Archived days are counted from their Parquet files.
+        paths = connection.execute(archived_paths_query()).scalars().all()
+        if paths:
+            from app.services.archive_service import archive_rollup_counts
+
+            archived = archive_rollup_counts(paths)
+            add_rollup_counts(connection, {tuple(row[:-1]): row[-1] for row in archived})
+            rows += len(archived)
+    data_generation.bump()
+    return rows
+
+
+def seed_daily_rollup(bind=engine):
+    # First start after the rollup was introduced: build it from existing rows.
+    with bind.connect() as connection:
+        empty = connection.execute(text("SELECT NOT EXISTS (SELECT 1 FROM log_daily_rollup)")).scalar()
+        has_logs = connection.execute(text("SELECT EXISTS (SELECT 1 FROM log_entries)")).scalar()
+    if empty and has_logs:
+        rebuild_daily_rollup(bind)
+
+
+def rollup_count():
+    return cast(func.sum(LogDailyRollup.log_count), BigInteger)
+
+
+if __name__ == "__main__":
+    print(f"Rebuilt log_daily_rollup: {rebuild_daily_rollup()} rows")
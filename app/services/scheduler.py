@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.models.database import SessionLocal
+from app.models.file_path import filepathEntry
+from app.services.ingest_service import ingest_next_file, find_next_file, IngestionInProgress
+from app.services.partition_service import LOG_ARCHIVE_AFTER_DAYS, run_partition_maintenance
+from app.services.query_filters import archived_paths_query
+
+INGEST_SCHEDULER_ENABLED = os.getenv("INGEST_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+INGEST_SCHEDULER_INTERVAL = float(os.getenv("INGEST_SCHEDULER_INTERVAL", "60"))
+INGEST_SCHEDULER_WORKERS = int(os.getenv("INGEST_SCHEDULER_WORKERS", "4"))
+INGEST_SCHEDULER_FILES_PER_TURN = int(os.getenv("INGEST_SCHEDULER_FILES_PER_TURN", "1"))
+# Upcoming partitions, archiving and the retention policy for log_entries.
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+
+def run_archive_maintenance():
+    # archive_service loads DuckDB and pyarrow, so it is only imported when
+    # archiving is on or archives written before it was turned off remain to
+    # be expired.
+    if not LOG_ARCHIVE_AFTER_DAYS:
+        with SessionLocal() as db:
+            if db.execute(archived_paths_query().limit(1)).first() is None:
+                return {"archived": [], "expired_archives": []}
+    from app.services import archive_service
+
+    return archive_service.run_archive_maintenance()
+
+
+class IngestScheduler:
+    def __init__(self, interval=INGEST_SCHEDULER_INTERVAL, max_workers=INGEST_SCHEDULER_WORKERS,
+                 files_per_turn=INGEST_SCHEDULER_FILES_PER_TURN, maintenance_interval=PARTITION_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self.maintenance_interval = maintenance_interval
+        self.max_workers = max_workers
+        self.files_per_turn = files_per_turn
+        self.systems = {}
+        self.last_poll = None
+        self.last_maintenance = None
+        self._queue = None
+        self._queued = set()
+        self._running = set()
+        self._tasks = []
+        self._executor = None
+
+    @property
+    def started(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest")
+        self._tasks = [asyncio.create_task(self._poll_loop()), asyncio.create_task(self._maintenance_loop())]
+        self._tasks += [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            # Lets an in-flight batch finish and commit its checkpoint.
+            await asyncio.to_thread(self._executor.shutdown, True)
+            self._executor = None
+
+    def enqueue(self, entry_id):
+        if entry_id in self._queued:
+            return False
+        self._queued.add(entry_id)
+        self._queue.put_nowait(entry_id)
+        return True
+
+    def notify(self, entry_id, file_paths):
+        # The watcher only wakes the system up; the run lists the folder, so
+        # files older than the reported ones are not skipped.
+        if self._queue is not None:
+            self.enqueue(entry_id)
+
+    def status(self):
+        return {
+            "enabled": self.started,
+            "interval_seconds": self.interval,
+            "max_workers": self.max_workers,
+            "files_per_turn": self.files_per_turn,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "running": len(self._running),
+            "last_poll": self.last_poll,
+            "last_maintenance": self.last_maintenance,
+            "systems": [
+                {**status, "queued": entry_id in self._queued, "running": entry_id in self._running}
+                for entry_id, status in self.systems.items()
+            ],
+        }
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                for entry_id in await asyncio.to_thread(self._load_systems):
+                    self.enqueue(entry_id)
+                self.last_poll = datetime.now()
+            except Exception as e:
+                print(f"Scheduler poll failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def _maintenance_loop(self):
+        while True:
+            try:
+                result = await asyncio.to_thread(run_partition_maintenance)
+                result.update(await asyncio.to_thread(run_archive_maintenance))
+                self.last_maintenance = {**result, "finished": datetime.now()}
+            except Exception as e:
+                print(f"Partition maintenance failed: {str(e)}")
+            await asyncio.sleep(self.maintenance_interval)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            entry_id = await self._queue.get()
+            self._running.add(entry_id)
+            has_more = False
+            try:
+                has_more = await loop.run_in_executor(self._executor, self._run_system, entry_id)
+            finally:
+                self._running.discard(entry_id)
+                self._queued.discard(entry_id)
+                self._queue.task_done()
+            # Systems with more pending files go to the back of the queue, so a
+            # large backlog on one system cannot starve the others.
+            if has_more:
+                self.enqueue(entry_id)
+
+    def _load_systems(self):
+        db = SessionLocal()
+        try:
+            entries = db.query(filepathEntry).all()
+            for entry in entries:
+                status = self.systems.setdefault(entry.id, {
+                    "id": entry.id,
+                    "last_run_started": None,
+                    "last_run_finished": None,
+                    "last_run_seconds": None,
+                    "last_files_processed": 0,
+                    "last_records_added": 0,
+                    "last_error": None,
+                    "total_files_processed": 0,
+                    "total_records_added": 0,
+                })
+                status.update({
+                    "sap_system_id": entry.sap_system_id,
+                    "app_server_instance": entry.app_server_instance,
+                    "file_path": entry.file_path,
+                })
+            known = {entry.id for entry in entries}
+            for entry_id in list(self.systems):
+                if entry_id not in known:
+                    self.systems.pop(entry_id)
+            return [entry.id for entry in entries]
+        finally:
+            db.close()
+
+    def _run_system(self, entry_id):
+        status = self.systems.get(entry_id)
+        if status is None:
+            return False
+        started = time.perf_counter()
+        status["last_run_started"] = datetime.now()
+        files_processed = 0
+        records_added = 0
+        error = None
+        has_more = False
+
+        db = SessionLocal()
+        try:
+            file_path_entry = db.get(filepathEntry, entry_id)
+            if file_path_entry is None:
+                return False
+            for _ in range(self.files_per_turn):
+                result = ingest_next_file(db, file_path_entry)
+                if result is None:
+                    break
+                records_added += result["records_added"]
+                if not result["success"]:
+                    error = f"Failed to parse: {result['file_name']}"
+                    break
+                files_processed += 1
+                # A tail pass has caught up with the open file; the watcher or
+                # the next poll picks up whatever SAP appends next.
+                if result["tail"]:
+                    break
+            else:
+                has_more = find_next_file(db, file_path_entry) is not None
+        except IngestionInProgress as e:
+            error = str(e)
+        except Exception as e:
+            error = f"Server error: {str(e)}"
+        finally:
+            db.close()
+            status.update({
+                "last_run_finished": datetime.now(),
+                "last_run_seconds": round(time.perf_counter() - started, 3),
+                "last_files_processed": files_processed,
+                "last_records_added": records_added,
+                "last_error": error,
+                "total_files_processed": status["total_files_processed"] + files_processed,
+                "total_records_added": status["total_records_added"] + records_added,
+            })
+        return has_more
+
+
+scheduler = IngestScheduler()
@@ -0,0 +1,116 @@
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import column, func, insert, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.log import MESSAGE_PLACEHOLDERS, LogEntry, StoredLogEntry
+from app.models.message_type import MessageType
+from app.models.sap_instance import SapInstance
+from app.services import dimension_service
+from app.services.dimension_service import needs_normalization, normalize_log_entries, sync_message_types
+from app.services.message_catalog import MESSAGE_CATALOG
+
+LEGACY_COLUMNS = (
+    "sap_system_id", "app_server_instance", "message_identifier", "syslog_msg_group", "sub_name", "date", "time",
+    "operating_system_number", "work_process_number", "sap_process", "client", "file_number",
+    "short_terminal_name", "user", "transaction_code", "program", "long_terminal_name",
+    "last_address_routed_no_of_variables", "first_variable_value", "second_variable_value", "third_variable_value",
+    "audit_log_msg_text", "audit_class", "message_severity", "criticality", "other_variable_values", "record_hash",
+)
+LEGACY_TABLE = "CREATE TABLE log_entries (id SERIAL, event_timestamp TIMESTAMP, {})".format(
+    ", ".join(f'"{name}" VARCHAR' for name in LEGACY_COLUMNS)
+)
+
+
+def legacy_entry(number, message_id, variables, message_text=None):
+    # A row as the parser wrote it before normalization.
+    entry = {
+        "event_timestamp": datetime(2024, 8, 1) + timedelta(seconds=number),
+        "sap_system_id": "TST",
+        "app_server_instance": "tst_00",
+        "message_identifier": message_id,
+        "record_hash": hashlib.sha256(str(number).encode()).hexdigest().upper(),
+    }
+    if variables:
+        entry.update({
+            "first_variable_value": variables[0],
+            "second_variable_value": variables[1] if len(variables) > 1 else "",
+            "third_variable_value": variables[2] if len(variables) > 2 else "",
+            "other_variable_values": "&".join(variables[3:]) if len(variables) > 3 else "",
+        })
+    template = MESSAGE_CATALOG.templates.get(message_id)
+    if template:
+        message_text = template["message_text"]
+        for placeholder, variable in zip(MESSAGE_PLACEHOLDERS, variables):
+            message_text = message_text.replace(placeholder, variable)
+    entry["audit_log_msg_text"] = message_text
+    return entry
+
+
+ROWS = [
+    ("AU4", ["SE38", "1"]),
+    ("AU4", ["SE38", ""]),
+    # Fewer variables than placeholders: &B stayed in the stored text.
+    ("AU4", ["SE38"]),
+    ("AU4", []),
+    ("AUF", ["1", "2", "3", "X", ""]),
+    ("AUF", ["1", "2", "3", "X", "Y", ""]),
+    # Message IDs missing from the catalog.
+    ("ZZ1", [], "Retired message one"),
+    ("ZZ1", [], "Retired message one"),
+    ("ZZ1", [], "Retired message two"),
+    ("ZZ2", ["A"]),
+]
+
+
+def create_legacy_entries(bind):
+    entries = [legacy_entry(number, *row) for number, row in enumerate(ROWS)]
+    legacy = table("log_entries", column("event_timestamp"), *[column(name) for name in LEGACY_COLUMNS])
+    MessageType.__table__.create(bind)
+    SapInstance.__table__.create(bind)
+    with bind.begin() as connection:
+        connection.execute(text(LEGACY_TABLE))
+        connection.execute(insert(legacy), [{name: entry.get(name) for name in legacy.c.keys()}
+                                            for entry in entries])
+    sync_message_types(bind)
+    return entries
+
+
+def stored_texts(bind):
+    with Session(bind) as session:
+        return session.execute(select(LogEntry.audit_log_msg_text).order_by(LogEntry.id)).scalars().all()
+
+
+def test_normalization_keeps_the_stored_message_text(scratch_engine):
+    entries = create_legacy_entries(scratch_engine)
+
+    assert normalize_log_entries(scratch_engine) == len(entries)
+
+    with Session(scratch_engine) as session:
+        overrides = session.scalar(select(func.count()).where(StoredLogEntry.message_text_override.isnot(None)))
+    assert stored_texts(scratch_engine) == [entry["audit_log_msg_text"] for entry in entries]
+    assert overrides == 3
+
+
+def test_interrupted_normalization_resumes(scratch_engine, monkeypatch):
+    entries = create_legacy_entries(scratch_engine)
+    drop_denormalized_columns = dimension_service._drop_denormalized_columns
+
+    def interrupted(connection):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(dimension_service, "_drop_denormalized_columns", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        normalize_log_entries(scratch_engine, batch_size=4)
+    with scratch_engine.connect() as connection:
+        assert needs_normalization(connection)
+        assert connection.scalar(text("SELECT count(*) FROM log_entries WHERE instance_id IS NULL")) == 0
+
+    monkeypatch.setattr(dimension_service, "_drop_denormalized_columns", drop_denormalized_columns)
+    # Every row was keyed by the first run.
+    assert normalize_log_entries(scratch_engine) == 0
+    with scratch_engine.connect() as connection:
+        assert not needs_normalization(connection)
+    assert stored_texts(scratch_engine) == [entry["audit_log_msg_text"] for entry in entries]
@@ -0,0 +1,109 @@
+import os
+from itertools import islice
+
+from sqlalchemy import func, select
+
+from app.models.log import StoredLogEntry
+from app.services import ingest_service, log_service
+from app.services.log_service import LogParser
+from benchmarks.sm20_generator import AuditFileGenerator
+
+
+def test_backlog_writes_every_pending_file_through_spill_files(db, audit_folder, file_path_entry, tmp_path,
+                                                               monkeypatch):
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    # Workers are spawned and read the setting from the environment.
+    monkeypatch.setenv("BACKLOG_SPILL_DIR", str(spill_dir))
+    monkeypatch.setenv("BACKLOG_SPILL_BATCH_SIZE", "7")
+    paths = audit_folder("20240801000000", "20240802000000", "20240803000000")
+
+    result = ingest_service.ingest_backlog(db, file_path_entry, max_workers=2)
+
+    assert result["processed"] == len(paths)
+    assert [file["file_name"] for file in result["files"]] == [os.path.basename(path) for path in paths]
+    assert db.scalar(select(func.count()).select_from(StoredLogEntry)) == result["records_added"]
+    assert result["records_added"] == sum(file["record_count"] for file in result["files"])
+    assert list(spill_dir.iterdir()) == []
+
+
+def generated_records(count, seed=3):
+    generator = AuditFileGenerator(seed=seed)
+    header = generator.file_header()
+    return header, list(islice(generator.records(), count))
+
+
+def stored_count(db):
+    return db.scalar(select(func.count()).select_from(StoredLogEntry))
+
+
+def test_interrupted_file_resumes_from_its_checkpoint(db, audit_folder, file_path_entry, monkeypatch):
+    audit_folder("20240801000000", "20240802000000")
+    monkeypatch.setattr(log_service, "COPY_BATCH_SIZE", 10)
+    copy_batch = LogParser._copy_batch
+    calls = []
+
+    def failing_copy_batch(parser, batch):
+        calls.append(len(batch))
+        if len(calls) == 4:
+            raise RuntimeError("connection lost")
+        return copy_batch(parser, batch)
+
+    monkeypatch.setattr(LogParser, "_copy_batch", failing_copy_batch)
+    first = ingest_service.ingest_next_file(db, file_path_entry)
+    checkpoint = ingest_service.get_last_processed_file(db, file_path_entry)
+    assert not first["success"]
+    assert (checkpoint.record_count, checkpoint.completed) == (30, False)
+    assert stored_count(db) == 30
+
+    monkeypatch.setattr(LogParser, "_copy_batch", copy_batch)
+    second = ingest_service.ingest_next_file(db, file_path_entry)
+
+    assert second["success"] and second["resumed"]
+    assert second["file_name"] == "20240801000000.AUD"
+    assert second["duplicates_skipped"] == 0
+    assert stored_count(db) == second["record_count"] == 30 + second["records_added"]
+
+
+def test_open_file_is_tailed_until_a_newer_file_appears(db, audit_folder, file_path_entry, monkeypatch):
+    monkeypatch.setattr(ingest_service, "INGEST_TAIL_ENABLED", True)
+    header, records = generated_records(60)
+    path = os.path.join(audit_folder.folder, "20240801000000.AUD")
+    cut = len(records[30]) // 2
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(header + "".join(records[:30]) + records[30][:cut])
+
+    first = ingest_service.ingest_next_file(db, file_path_entry)
+    checkpoint = ingest_service.get_last_processed_file(db, file_path_entry)
+    assert first["tail"] and first["success"]
+    assert (first["records_added"], checkpoint.completed) == (30, False)
+    assert checkpoint.byte_offset == len((header + "".join(records[:30])).encode("utf-8"))
+
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write(records[30][cut:] + "".join(records[31:45]))
+    second = ingest_service.ingest_next_file(db, file_path_entry)
+    assert second["tail"] and second["resumed"]
+    assert second["records_added"] == 15
+
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        f.write("".join(records[45:]))
+    audit_folder("20240802000000")
+    third = ingest_service.ingest_next_file(db, file_path_entry)
+    db.expire_all()
+    checkpoint = ingest_service.get_last_processed_file(db, file_path_entry)
+
+    assert not third["tail"]
+    assert third["records_added"] == 15
+    assert (checkpoint.file_name, checkpoint.completed, checkpoint.record_count) == ("20240801000000.AUD", True, 60)
+    assert stored_count(db) == 60
+
+
+def test_newest_file_is_read_whole_without_tail_mode(db, audit_folder, file_path_entry):
+    audit_folder("20240801000000")
+
+    first = ingest_service.ingest_next_file(db, file_path_entry)
+    checkpoint = ingest_service.get_last_processed_file(db, file_path_entry)
+
+    assert first["success"] and not first["tail"]
+    assert checkpoint.completed
+    assert ingest_service.ingest_next_file(db, file_path_entry) is None
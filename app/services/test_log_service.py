@@ -0,0 +1,81 @@
+import glob
+import os
+from itertools import islice
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.log import StoredLogEntry
+from app.models.log_daily_rollup import LogDailyRollup
+from app.services import log_service
+from app.services.log_service import LogParser
+from benchmarks.sm20_generator import AuditFileGenerator
+
+RECORDS = 80
+
+
+def write_audit_file(path, records=RECORDS):
+    generator = AuditFileGenerator(seed=7)
+    header = generator.file_header()
+    records = list(islice(generator.records(), records))
+    path.write_text(header + "".join(records), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("bulk_copy", [True, False])
+def test_reingested_records_are_skipped_as_duplicates(db, tmp_path, bulk_copy):
+    path = write_audit_file(tmp_path / "20240801000000.AUD")
+    passes = []
+    for _ in range(2):
+        parser = LogParser(path, db_session=db, sap_system_id="TST", app_server_instance="tst_00", delimiter="0035",
+                           bulk_copy=bulk_copy)
+        assert parser.parse_and_store()
+        passes.append((parser.records_inserted, parser.duplicates))
+
+    assert passes == [(RECORDS, 0), (0, RECORDS)]
+    assert db.scalar(select(func.count()).select_from(StoredLogEntry)) == RECORDS
+    assert db.scalar(select(func.sum(LogDailyRollup.log_count))) == RECORDS
+
+
+@pytest.mark.parametrize("bulk_copy", [True, False])
+def test_only_records_past_an_earlier_ingest_are_inserted(db, tmp_path, monkeypatch, bulk_copy):
+    # The file has grown since it was first stored; its new records start
+    # inside a batch.
+    monkeypatch.setattr(log_service, "COPY_BATCH_SIZE", 20)
+    monkeypatch.setattr(log_service, "SAVE_BATCH_SIZE", 20)
+    (tmp_path / "first").mkdir()
+    passes = []
+    for path in (write_audit_file(tmp_path / "first" / "20240801000000.AUD", 30),
+                 write_audit_file(tmp_path / "20240801000000.AUD")):
+        parser = LogParser(path, db_session=db, sap_system_id="TST", app_server_instance="tst_00", delimiter="0035",
+                           bulk_copy=bulk_copy)
+        assert parser.parse_and_store()
+        passes.append((parser.records_inserted, parser.duplicates))
+
+    assert passes == [(30, 0), (RECORDS - 30, 30)]
+    assert db.scalar(select(func.count()).select_from(StoredLogEntry)) == RECORDS
+    assert db.scalar(select(func.sum(LogDailyRollup.log_count))) == RECORDS
+
+
+SAP_LOGS = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "uploaded_logs",
+                        "sap_logs")
+
+
+@pytest.mark.parametrize("bulk_copy", [True, False])
+def test_every_record_of_the_sap_corpus_is_stored_once(db, bulk_copy):
+    # The corpus has identical events in the same second, which share a hash.
+    paths = sorted(glob.glob(os.path.join(SAP_LOGS, "*.AUD")))
+    passes = []
+    for _ in range(2):
+        parsed = inserted = 0
+        for path in paths:
+            parser = LogParser(path, db_session=db, sap_system_id="TST", app_server_instance="tst_00",
+                               delimiter="0035", bulk_copy=bulk_copy)
+            assert parser.parse_and_store()
+            parsed += parser.records_parsed
+            inserted += parser.records_inserted
+        passes.append((parsed, inserted))
+
+    parsed = passes[0][0]
+    assert passes == [(parsed, parsed), (parsed, 0)]
+    assert db.scalar(select(func.count()).select_from(StoredLogEntry)) == parsed
@@ -0,0 +1,48 @@
+from itertools import islice
+
+from sqlalchemy import select, text
+
+from app.models.log import LogEntry, StoredLogEntry
+from app.services.log_service import LogParser
+from benchmarks.sm20_generator import AuditFileGenerator
+
+
+def test_cursor_pages_cover_every_row_once_in_order(db, tmp_path):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Timestamps repeat in generated files, so pages also split on id.
+    generator = AuditFileGenerator(seed=11)
+    path = tmp_path / "20240801000000.AUD"
+    path.write_text(generator.file_header() + "".join(islice(generator.records(), 120)), encoding="utf-8")
+    assert LogParser(str(path), db_session=db, sap_system_id="TST", app_server_instance="tst_00",
+                     delimiter="0035").parse_and_store()
+    # Copies without a timestamp, which sort first; the first page ends among
+    # them, so its cursor has no timestamp.
+    copied = ", ".join(f'"{column.name}"' for column in StoredLogEntry.__table__.columns
+                       if column.name not in ("id", "event_timestamp", "record_hash"))
+    db.execute(text(f"""
+        INSERT INTO log_entries ({copied}, record_hash)
+        SELECT {copied}, decode(md5(id::text), 'hex') FROM log_entries ORDER BY id LIMIT 10
+    """))
+    db.commit()
+    expected = db.execute(
+        select(LogEntry.record_hash).order_by(LogEntry.event_timestamp.desc(), LogEntry.id.desc())
+    ).scalars().all()
+
+    pages = []
+    cursor = None
+    with TestClient(app) as client:
+        while True:
+            params = {"limit": 7, "exact_total": True}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/logs/params/", params=params).json()
+            pages.append(page)
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+    assert [entry["record_hash"] for page in pages for entry in page["logs"]] == expected
+    assert all(page["total_logs"] == len(expected) == 130 for page in pages)
+    assert all(len(page["logs"]) == 7 for page in pages[:-1])
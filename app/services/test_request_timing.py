@@ -0,0 +1,24 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.services.request_timing import RequestTiming, _current_timing, install_db_timing
+
+
+def test_failed_statements_do_not_leak_timing_state(engine):
+    install_db_timing(engine)
+    timing = RequestTiming("GET")
+    token = _current_timing.set(timing)
+    try:
+        with engine.connect() as connection:
+            for _ in range(3):
+                with pytest.raises(DBAPIError):
+                    connection.execute(text("SELECT missing_column"))
+                connection.rollback()
+            connection.execute(text("SELECT 1"))
+            leftover = dict(connection.info)
+    finally:
+        _current_timing.reset(token)
+
+    assert "query_started" not in leftover
+    assert timing.db_queries == 1
@@ -0,0 +1,21 @@
+import os
+
+from app.services.ingest_service import get_last_processed_file
+from app.services.scheduler import IngestScheduler
+
+
+def test_watcher_notification_does_not_skip_older_pending_files(db, audit_folder, file_path_entry):
+    paths = audit_folder("20240808000000", "20240809000000", "20240830000000", "20240910000000")
+    scheduler = IngestScheduler(files_per_turn=1)
+    scheduler._load_systems()
+
+    ingested = []
+    for notified in (None, paths[3], None, None):
+        if notified:
+            scheduler.notify(file_path_entry.id, {notified})
+        scheduler._run_system(file_path_entry.id)
+        db.expire_all()
+        ingested.append(get_last_processed_file(db, file_path_entry).file_name)
+
+    assert ingested == [os.path.basename(path) for path in paths]
+    assert scheduler.systems[file_path_entry.id]["last_error"] is None
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import re
+from datetime import datetime
+
+from watchfiles import Change, awatch
+
+from app.models.database import SessionLocal
+from app.models.file_path import filepathEntry
+from app.services.scheduler import scheduler
+
+INGEST_WATCHER_ENABLED = os.getenv("INGEST_WATCHER_ENABLED", "true").lower() in ("1", "true", "yes")
+INGEST_WATCHER_DEBOUNCE_MS = int(os.getenv("INGEST_WATCHER_DEBOUNCE_MS", "200"))
+INGEST_WATCHER_REFRESH_INTERVAL = float(os.getenv("INGEST_WATCHER_REFRESH_INTERVAL", "60"))
+# Network shares usually do not deliver native notifications.
+INGEST_WATCHER_FORCE_POLLING = os.getenv("INGEST_WATCHER_FORCE_POLLING", "false").lower() in ("1", "true", "yes")
+
+AUDIT_FILE_PATTERN = re.compile(r"^\d{14,16}\.AUD$")
+
+
+def is_audit_file_change(change, path):
+    return change != Change.deleted and AUDIT_FILE_PATTERN.match(os.path.basename(path)) is not None
+
+
+def normalize_folder(folder_path):
+    return os.path.normcase(os.path.normpath(os.path.abspath(folder_path)))
+
+
+class IngestWatcher:
+    def __init__(self, scheduler, debounce_ms=INGEST_WATCHER_DEBOUNCE_MS,
+                 refresh_interval=INGEST_WATCHER_REFRESH_INTERVAL, force_polling=INGEST_WATCHER_FORCE_POLLING):
+        self.scheduler = scheduler
+        self.debounce_ms = debounce_ms
+        self.refresh_interval = refresh_interval
+        self.force_polling = force_polling
+        self.folders = {}
+        self.events = 0
+        self.last_event = None
+        self.last_file = None
+        self._task = None
+        self._restart = None
+        self._stopping = False
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            # awatch blocks in a worker thread, so it is stopped through its
+            # stop event rather than by cancelling the task underneath it.
+            self._stopping = True
+            if self._restart:
+                self._restart.set()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout=5)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self):
+        return {
+            "enabled": self._task is not None,
+            "folders": sorted(self.folders),
+            "events": self.events,
+            "last_event": self.last_event,
+            "last_file": self.last_file,
+        }
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                self.folders = await asyncio.to_thread(self._load_folders)
+                if not self.folders:
+                    await asyncio.sleep(self.refresh_interval)
+                    continue
+
+                # The watch is restarted whenever the configured folders change.
+                self._restart = asyncio.Event()
+                refresher = asyncio.create_task(self._watch_config(self.folders, self._restart))
+                try:
+                    async for changes in awatch(
+                            *self.folders,
+                            watch_filter=is_audit_file_change,
+                            debounce=self.debounce_ms,
+                            stop_event=self._restart,
+                            recursive=False,
+                            force_polling=self.force_polling
+                    ):
+                        self._dispatch(changes)
+                finally:
+                    refresher.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Watcher failed: {str(e)}")
+                await asyncio.sleep(self.refresh_interval)
+
+    async def _watch_config(self, folders, restart):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            if await asyncio.to_thread(self._load_folders) != folders:
+                restart.set()
+                return
+
+    def _dispatch(self, changes):
+        changed_files = {}
+        for _, path in changes:
+            changed_files.setdefault(normalize_folder(os.path.dirname(path)), set()).add(path)
+
+        for folder, file_paths in changed_files.items():
+            for entry_id in self.folders.get(folder, ()):
+                self.scheduler.notify(entry_id, file_paths)
+        self.events += len(changes)
+        self.last_event = datetime.now()
+        self.last_file = max(os.path.basename(path) for _, path in changes)
+
+    def _load_folders(self):
+        db = SessionLocal()
+        try:
+            folders = {}
+            for entry in db.query(filepathEntry).all():
+                if entry.file_path and os.path.isdir(entry.file_path):
+                    folders.setdefault(normalize_folder(entry.file_path), []).append(entry.id)
+            return folders
+        finally:
+            db.close()
+
+
+watcher = IngestWatcher(scheduler)
@@ -0,0 +1,114 @@
+# Insert throughput of the COPY loader against the ORM fallback.
+#
+#   python -m benchmarks.bench_bulk_load [--corpus uploaded_logs/sap_logs] [--repeat 1]
+#
+# Only the write is timed. Every file in the corpus is parsed and written
+# through LogParser, with deduplication on, inside a transaction that is
+# rolled back afterwards, so the benchmark leaves no rows in log_entries; the
+# partitions for the corpus's months are created and kept.
+# Re-ingesting the corpus, where every row is a duplicate, is timed
+# separately. The sap_instances row the dimension cache commits for
+# the BENCH system is deleted again at the end. Needs the database configured
+# in app.models.database.
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+
+from sqlalchemy import delete, exists
+
+from app.models.database import Base, SessionLocal, engine
+from app.models.log import StoredLogEntry
+from app.models.sap_instance import SapInstance
+from app.services.dimension_service import dimension_cache
+from app.services.log_service import LogParser
+from app.services.partition_service import ensure_partitions
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploaded_logs", "sap_logs")
+DELIMITER = "0035"
+BENCH_SYSTEM = "BENCH"
+BENCH_INSTANCE = "bench_00"
+
+
+def remove_bench_instance():
+    # Dimension rows are committed on their own connection, outside the
+    # transaction the benchmarks roll back.
+    with engine.begin() as connection:
+        connection.execute(delete(SapInstance).where(
+            SapInstance.sap_system_id == BENCH_SYSTEM,
+            SapInstance.app_server_instance == BENCH_INSTANCE,
+            ~exists().where(StoredLogEntry.instance_id == SapInstance.id)
+        ))
+    dimension_cache.reset()
+
+
+def corpus_days(files):
+    days = set()
+    for path in files:
+        parser = LogParser(path, delimiter=DELIMITER)
+        days.update(entry["event_timestamp"].date() for entry in parser.iter_records() if entry["event_timestamp"])
+    return days
+
+
+def write(db, files, bulk_copy):
+    rows = 0
+    elapsed = 0.0
+    for path in files:
+        parser = LogParser(path, db_session=db, sap_system_id=BENCH_SYSTEM, app_server_instance=BENCH_INSTANCE,
+                           delimiter=DELIMITER, bulk_copy=bulk_copy)
+        parsed_logs = list(parser._parse_log_data(parser._process_audit_file()))
+        rows += len(parsed_logs)
+        started = time.perf_counter()
+        parser._save_parsed_logs(iter(parsed_logs))
+        elapsed += time.perf_counter() - started
+    return rows, elapsed
+
+
+def load(files, bulk_copy, repeat):
+    # Each repeat writes the corpus into empty tables and then writes it
+    # again, which skips every row as a duplicate; the transaction is rolled
+    # back before the next repeat.
+    fresh = [0, 0.0]
+    again = [0, 0.0]
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(repeat):
+                db = SessionLocal()
+                db.commit = db.flush
+                try:
+                    for totals in (fresh, again):
+                        rows, elapsed = write(db, files, bulk_copy)
+                        totals[0] += rows
+                        totals[1] += elapsed
+                finally:
+                    db.rollback()
+                    db.close()
+    finally:
+        remove_bench_instance()
+    return fresh, again
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    arg_parser.add_argument("--repeat", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    files = sorted(glob.glob(os.path.join(args.corpus, "*.AUD")))
+    # A month's partition is created once, by the first ingest that needs it.
+    # Created here and kept, so rolled-back batches do not create it again.
+    with engine.begin() as connection:
+        ensure_partitions(connection, corpus_days(files))
+    results = {}
+    for label, bulk_copy in (("orm", False), ("copy", True)):
+        fresh, again = load(files, bulk_copy, args.repeat)
+        results[label] = fresh[0] / fresh[1]
+        print(f"{label:>5}: {fresh[0]} rows in {fresh[1]:.2f}s ({results[label]:,.0f} rows/s), "
+              f"re-ingested in {again[1]:.2f}s ({again[0] / again[1]:,.0f} rows/s)")
+    print(f"speedup: {results['copy'] / results['orm']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Export size and throughput of the CSV stream against the Parquet stream.
+#
+#   python -m benchmarks.bench_export [--sap-system-id S4H] [--repeat 3]
+#
+# Reads whatever log_entries already holds through the same streaming query the
+# /logs/download/ endpoints use. Needs the database configured in app.models.database.
+import argparse
+import time
+
+from app.services.export_service import (CSV_EXPORT_COLUMNS, PARQUET_EXPORT_COLUMNS, open_export_rows, stream_csv,
+                                         stream_parquet)
+
+
+def export(label, filters, repeat):
+    elapsed = 0.0
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if label == "csv":
+            rows = open_export_rows(filters, list(CSV_EXPORT_COLUMNS.values()))
+            chunks = stream_csv(list(CSV_EXPORT_COLUMNS), rows) if rows else ()
+        else:
+            rows = open_export_rows(filters, list(PARQUET_EXPORT_COLUMNS))
+            chunks = stream_parquet(list(PARQUET_EXPORT_COLUMNS), rows) if rows else ()
+        size = sum(len(chunk) for chunk in chunks)
+        elapsed += time.perf_counter() - started
+    return size, elapsed / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sap-system-id", default=None)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    filters = {"sap_system_id": args.sap_system_id}
+    results = {}
+    for label in ("csv", "parquet"):
+        size, elapsed = export(label, filters, args.repeat)
+        results[label] = size, elapsed
+        print(f"{label:>8}: {size / 1e6:.2f} MB in {elapsed:.2f}s")
+    print(f"size ratio: {results['csv'][0] / max(results['parquet'][0], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Record-boundary throughput as the message catalog grows.
+#
+#   python -m benchmarks.bench_message_catalog [--mb 20] [--sizes 191,1000,5000,20000]
+#
+# The same corpus is split with catalogs of increasing size. The catalog-backed
+# scanner should stay flat; the legacy regex alternation is shown for reference.
+import argparse
+import contextlib
+import glob
+import io
+import itertools
+import os
+import re
+import string
+import tempfile
+import time
+
+from message_templates import MESSAGE_TEMPLATES
+from app.services.log_service import LogParser
+from app.services.message_catalog import MessageCatalog
+
+CORPUS_GLOB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploaded_logs", "sap_logs", "*.AUD")
+DELIMITER = "0035"
+
+
+def build_corpus(path, target_mb):
+    sample = b"".join(open(f, "rb").read() for f in sorted(glob.glob(CORPUS_GLOB)))
+    target = target_mb * 1024 * 1024
+    with open(path, "wb") as out:
+        written = 0
+        while written < target:
+            out.write(sample)
+            written += len(sample)
+    return written
+
+
+def grow_catalog(size):
+    templates = dict(MESSAGE_TEMPLATES)
+    filler = {"audit_class": "Other Events", "message_severity": "Low", "message_text": "Synthetic &A"}
+    alphabet = string.ascii_uppercase + string.digits
+    for chars in itertools.product(alphabet, repeat=3):
+        if len(templates) >= size:
+            break
+        templates.setdefault("".join(chars), filler)
+    return templates
+
+
+def catalog_split(path, templates):
+    parser = LogParser(path, delimiter=DELIMITER, catalog=MessageCatalog(templates))
+    return sum(1 for _ in parser._process_audit_file())
+
+
+def legacy_split(path, templates):
+    with open(path, "r") as f:
+        content = f.read()
+    message_class_pattern = "|".join(re.escape(cls) for cls in templates)
+    replacement_pattern = re.compile(f"({re.escape(DELIMITER)})({message_class_pattern})")
+    modified_content = replacement_pattern.sub(r"\1TRNT\2", content)
+    return len(re.compile(re.escape(DELIMITER + "TRNT")).split(modified_content)) - 1
+
+
+def measure(split, path, templates, size_bytes):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        segments = split(path, templates)
+    elapsed = time.perf_counter() - started
+    return segments, size_bytes / elapsed / 1024 / 1024
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--mb", type=int, default=20)
+    arg_parser.add_argument("--sizes", default=f"{len(MESSAGE_TEMPLATES)},1000,5000,20000")
+    arg_parser.add_argument("--skip-legacy", action="store_true")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.AUD")
+        size_bytes = build_corpus(path, args.mb)
+        print(f"corpus: {size_bytes / 1024 / 1024:.1f} MB")
+        print(f"{'classes':>8} {'segments':>10} {'catalog MB/s':>13} {'legacy MB/s':>12}")
+        for size in (int(s) for s in args.sizes.split(",")):
+            templates = grow_catalog(size)
+            segments, catalog_rate = measure(catalog_split, path, templates, size_bytes)
+            legacy_rate = "-"
+            if not args.skip_legacy:
+                legacy_segments, rate = measure(legacy_split, path, templates, size_bytes)
+                assert legacy_segments == segments, (legacy_segments, segments)
+                legacy_rate = f"{rate:.1f}"
+            print(f"{len(templates):>8} {segments:>10} {catalog_rate:>13.1f} {legacy_rate:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# Parser and ingest throughput on synthetic SM20 files, compared with a saved baseline.
+#
+#   python -m benchmarks.bench_parser [--sizes 10,100,1000] [--stages scan,parse,ingest]
+#                                     [--save-baseline] [--tolerance 0.10]
+#
+# Stages:
+#   scan    LogParser._process_audit_file (record boundaries only)
+#   parse   _parse_log_data over the scanned segments
+#   ingest  parse plus the batched COPY writes, inside a transaction that is
+#           rolled back afterwards; the BENCH row the dimension cache commits
+#           to sap_instances is deleted again. Needs the database in
+#           app.models.database
+#
+# Every measurement runs in a fresh process and reports two memory figures.
+# Peak RSS is the process's high-water mark (VmHWM), which includes the
+# resident pages of the memory-mapped file. Peak heap is the peak growth of
+# anonymous memory over the stage (RssAnon, sampled), i.e. what the parser
+# allocates. Without /proc, peak RSS comes from getrusage and peak heap from
+# tracemalloc, which slows the stage down. Files come from benchmarks.sm20_generator and are cached in
+# --data-dir. Results are compared with benchmarks/baselines/bench_parser.json;
+# the exit status is 1 when any metric is worse than the baseline by more than
+# --tolerance. Baselines are machine specific: save your own before comparing.
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.sm20_generator import generate_audit_file
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "bench_parser.json")
+DELIMITER = "0035"
+STAGES = ("scan", "parse", "ingest")
+# Higher is better for throughput, lower is better for memory.
+METRICS = {"mb_per_second": 1, "records_per_second": 1, "peak_rss_mb": -1, "peak_heap_mb": -1}
+PROC_STATUS = "/proc/self/status"
+SAMPLE_INTERVAL = 0.01
+
+
+def audit_file(data_dir, size_mb, seed):
+    path = os.path.join(data_dir, f"synthetic_{size_mb}MB_seed{seed}.AUD")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        partial = path + ".partial"
+        generate_audit_file(partial, size_mb * 1024 * 1024, seed)
+        os.replace(partial, path)
+    return path
+
+
+def status_mb(field):
+    with open(PROC_STATUS) as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class PeakMemory:
+    def __init__(self):
+        self.peak_rss_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def __enter__(self):
+        if os.path.exists(PROC_STATUS):
+            start = status_mb("RssAnon")
+
+            def sample():
+                while True:
+                    self.peak_mb = max(self.peak_mb, status_mb("RssAnon") - start)
+                    if self._stop.wait(SAMPLE_INTERVAL):
+                        return
+
+            self._sampler = threading.Thread(target=sample, daemon=True)
+            self._sampler.start()
+        else:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+            self.peak_rss_mb = status_mb("VmHWM")
+        else:
+            self.peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+            # ru_maxrss is in bytes on macOS, kilobytes elsewhere.
+            self.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (
+                1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_stage(stage, path):
+    from app.services.log_service import LogParser
+    from benchmarks.bench_bulk_load import BENCH_INSTANCE, BENCH_SYSTEM, remove_bench_instance
+
+    db = None
+    if stage == "ingest":
+        from app.models.database import SessionLocal
+        db = SessionLocal()
+        db.commit = db.flush
+
+    parser = LogParser(path, db_session=db, sap_system_id=BENCH_SYSTEM, app_server_instance=BENCH_INSTANCE,
+                       delimiter=DELIMITER)
+    try:
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            if stage == "scan":
+                records = sum(1 for _ in parser._process_audit_file())
+            elif stage == "parse":
+                records = sum(1 for _ in parser._parse_log_data(parser._process_audit_file()))
+            else:
+                parser._save_parsed_logs(parser._parse_log_data(parser._process_audit_file()))
+                records = parser.record_count
+            elapsed = time.perf_counter() - started
+    finally:
+        if db is not None:
+            db.rollback()
+            db.close()
+            remove_bench_instance()
+    return records, elapsed, memory.peak_rss_mb, memory.peak_mb
+
+
+def measure(stage, path):
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        records, elapsed, rss_mb, heap_mb = pool.submit(run_stage, stage, path).result()
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    return {
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "mb_per_second": round(size_mb / elapsed, 2),
+        "records_per_second": round(records / elapsed, 1),
+        "peak_rss_mb": round(rss_mb, 1),
+        "peak_heap_mb": round(heap_mb, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not reference:
+                continue
+            for metric, direction in METRICS.items():
+                # Baselines saved before a metric existed are not compared on it.
+                if metric not in reference:
+                    continue
+                change = (result[metric] - reference[metric]) / reference[metric] if reference[metric] else 0.0
+                flag = ""
+                if change * direction < -tolerance:
+                    flag = "  REGRESSION"
+                    regressions.append(f"{size} {stage} {metric}")
+                print(f"  {size:>7} {stage:<6} {metric:<18} {reference[metric]:>12,.1f} -> {result[metric]:>12,.1f}"
+                      f" ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--sizes", default="10,100,1000", help="File sizes in MB")
+    arg_parser.add_argument("--stages", default=",".join(STAGES))
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "sm20_bench"))
+    arg_parser.add_argument("--baseline", default=BASELINE_PATH)
+    arg_parser.add_argument("--save-baseline", action="store_true")
+    arg_parser.add_argument("--tolerance", type=float, default=0.10)
+    args = arg_parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(",") if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        arg_parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for size_mb in (int(size) for size in args.sizes.split(",")):
+        path = audit_file(args.data_dir, size_mb, args.seed)
+        size = f"{size_mb}MB"
+        results[size] = {}
+        for stage in stages:
+            result = measure(stage, path)
+            results[size][stage] = result
+            print(f"{size:>7} {stage:<6} {result['records']:>10} records {result['seconds']:>8.2f}s "
+                  f"{result['mb_per_second']:>8.2f} MB/s {result['records_per_second']:>12,.0f} rec/s "
+                  f"peak RSS {result['peak_rss_mb']:>7.1f} MB peak heap {result['peak_heap_mb']:>7.1f} MB")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        for size, stage_results in results.items():
+            baseline.setdefault(size, {}).update(stage_results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if baseline:
+        print("Against baseline:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
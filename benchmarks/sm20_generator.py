@@ -0,0 +1,132 @@
+# Synthetic SM20 .AUD files in the on-disk record layout.
+#
+#   python -m benchmarks.sm20_generator OUTPUT.AUD [--mb 100] [--seed 0]
+#
+# Each record is the 4-digit header length (0035), the 35-character header
+# (message ID, date, time, process data, client), six length-prefixed
+# variable fields, length-prefixed '&'-separated event data, the 4-digit
+# record length and a 64-hex record hash. Every message class in
+# MESSAGE_TEMPLATES is used, with event variables up to the highest
+# placeholder (&A..&J) in its text. The hashes form a SHA-256 chain but are
+# not SAP's own integrity MAC.
+import argparse
+import hashlib
+import random
+import re
+from datetime import datetime, timedelta
+
+from message_templates import MESSAGE_TEMPLATES
+
+FILE_HEADER_PREFIX = "5SAL_SAP_19720607_000000_FFFFFFFFFFFF"
+HEADER_LENGTH_PREFIX = "0035"
+PLACEHOLDER = re.compile(r"&[A-J]")
+
+USERS = ["DDIC", "SAP*", "BPINST", "VASUA", "FF_ADMIN", "BATCH_JOBS", "RFC_USER", "AUDITOR01", "DEV_M.KUMAR",
+         "BASIS_OPS"]
+TCODES = ["", "S000", "SU01", "SM20", "SE38", "SE16N", "PFCG", "SM59", "STMS", "SIMG", "SM37", "SU53", "VA01"]
+PROGRAMS = ["SAPMSSY1", "SAPMSSYC", "SAPMHTTP", "SAPMSYST", "RSBTCRTE", "RS_SPRO_REFERENCE_IMG_DISPLAY",
+            "SAPLSUU5", "RSAU_READ_LOG", "SAPLSRFC"]
+TERMINALS = ["10.0.45.178", "223.187.53.184", "TI-LAP-465", "ec2-3-88-119-37.compute-1.amazonaws.com",
+             "160.238.72.229", "WS-FIN-0042", ""]
+PROCESSES = ["B1", "D9", "De", "D8", "Dd", "Dc", "D5", "D7", "Db", "Bt"]
+CLIENTS = ["100", "   ", "000", "300"]
+VARIABLE_VALUES = ["A", "B", "C", "1", "0", "SAPGUI", "RFC", "X", "ZFI_POSTING", "RFC_READ_TABLE", "BAPI_USER_GET",
+                   "SAP_ALL", "Z_BC_ADMIN", "12", "Password logon", "/sap/bc/gui/sap/its/webgui"]
+
+
+def length_prefixed(value):
+    return f"{len(value):04d}{value}"
+
+
+def variable_count(message_text):
+    # Variables are positional: &C needs three values even without &B.
+    return max((ord(name[1]) - ord("A") + 1 for name in PLACEHOLDER.findall(message_text)), default=0)
+
+
+class AuditFileGenerator:
+    def __init__(self, seed=0, start=datetime(2024, 1, 1), templates=MESSAGE_TEMPLATES):
+        self.random = random.Random(seed)
+        self.timestamp = start
+        self.classes = [
+            (message_id, variable_count(template["message_text"]))
+            for message_id, template in sorted(templates.items())
+        ]
+        self.previous_hash = hashlib.sha256(str(seed).encode()).hexdigest().upper()
+
+    def file_header(self):
+        return FILE_HEADER_PREFIX + self.previous_hash
+
+    def record(self, message_id=None, variables=None):
+        if message_id is None:
+            message_id, variables = self.random.choice(self.classes)
+        self.timestamp += timedelta(seconds=self.random.choice((0, 0, 0, 1, 1, 2, 5)))
+        choice = self.random.choice
+        long_terminal = choice(TERMINALS)
+
+        header = "".join((
+            message_id,
+            self.timestamp.strftime("%Y%m%d%H%M%S"),
+            "00",
+            f"{self.random.randrange(100000):05d}",
+            f"{self.random.randrange(100):05d}",
+            choice(PROCESSES),
+            choice(CLIENTS),
+            "0",
+        ))
+        fields = "".join(length_prefixed(value) for value in (
+            long_terminal[:8],
+            choice(USERS),
+            choice(TCODES),
+            choice(PROGRAMS),
+            long_terminal[:20],
+            choice(TERMINALS)[:20],
+        ))
+        event_data = "&".join(choice(VARIABLE_VALUES) for _ in range(variables))
+        body = header + fields + length_prefixed(event_data)
+        record_length = f"{len(body) + 4:04d}"
+        self.previous_hash = hashlib.sha256((self.previous_hash + body + record_length).encode()).hexdigest().upper()
+        return HEADER_LENGTH_PREFIX + body + record_length + self.previous_hash
+
+    def records(self):
+        # One record of every class first, so even small files cover the catalog.
+        for message_id, variables in self.classes:
+            yield self.record(message_id, variables)
+        while True:
+            yield self.record()
+
+
+def generate_audit_file(path, size_bytes, seed=0):
+    generator = AuditFileGenerator(seed)
+    written = 0
+    records = 0
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        header = generator.file_header()
+        out.write(header)
+        written += len(header)
+        chunk = []
+        for record in generator.records():
+            if written >= size_bytes:
+                break
+            chunk.append(record)
+            written += len(record)
+            records += 1
+            if len(chunk) >= 10000:
+                out.write("".join(chunk))
+                chunk.clear()
+        out.write("".join(chunk))
+    return written, records
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("output")
+    arg_parser.add_argument("--mb", type=float, default=100)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    written, records = generate_audit_file(args.output, int(args.mb * 1024 * 1024), args.seed)
+    print(f"{args.output}: {records} records, {written / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()